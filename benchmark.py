@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from ledger import TransactionStore, HistoryQuery, DEBIT, current_timestamp
+from storage import JournalStorage
+from core import LOCK_FILE, Ledger
+
+# Synthetic-ledger benchmarks for the transaction hot path. By default the GUI paths run against
+# a headless stub (Ledger + HistoryQuery + the offscreen Agg chart); --display drives the real
+# WalletApp instead, which needs an X display such as `xvfb-run python benchmark.py --display`.
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+CATEGORIES = [f"category{i}" for i in range(40)]
+
+
+def make_ledger(data_dir, size, seed=0):
+    rng = np.random.default_rng(seed)
+    now = current_timestamp()
+    timestamps = np.sort(rng.integers(now - 3 * 365 * 86400, now - 86400, size))
+    kinds = (rng.random(size) < 0.8).astype(np.uint8)
+    amounts = np.where(kinds == DEBIT, rng.integers(100, 50000, size), rng.integers(100000, 5000000, size))
+    codes = rng.integers(0, len(CATEGORIES), size).astype(np.int32)
+    store = TransactionStore.from_columns(timestamps, kinds, codes, amounts, CATEGORIES)
+    JournalStorage(snapshot_path=os.path.join(data_dir, "wallet_snapshot.npz")).snapshot(store)
+    with open(os.path.join(data_dir, "settings.json"), "w") as f:
+        json.dump({"user_name": "bench", "daily_limit": 0.0, "monthly_limit": 0.0}, f)
+    with open(os.path.join(data_dir, "regular_categories.json"), "w") as f:
+        json.dump({"rent": 15000.0, "groceries": 5000.0}, f)
+
+
+def measure(fn, max_repeat, budget):
+    # Repeat until max_repeat runs or the time budget is spent (always at least once), then one
+    # extra traced run for peak memory
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_repeat and (not times or time.perf_counter() - started < budget):
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "repeat": len(times),
+        "min_ms": round(min(times), 4),
+        "median_ms": round(statistics.median(times), 4),
+        "mean_ms": round(statistics.fmean(times), 4),
+        "peak_kb": round(peak / 1024, 1)
+    }
+
+
+def headless_operations(data_dir):
+    from charts import OffscreenChart
+
+    ledger = Ledger(data_dir)
+    query = HistoryQuery(ledger.transactions)
+    chart = OffscreenChart()
+    chart.update(ledger.reports.samples())
+    export_path = os.path.join(data_dir, "export.json")
+
+    # The wallet is locked while `ledger` has it open, so opening is timed on a copy
+    load_dir = os.path.join(data_dir, "load")
+    shutil.rmtree(load_dir, ignore_errors=True)
+    shutil.copytree(data_dir, load_dir, ignore=shutil.ignore_patterns(LOCK_FILE, "load"))
+
+    def load():
+        Ledger(load_dir).close()
+
+    def save_transaction():
+        ledger.check("Debit", 1.0)
+        ledger.add("bench", 1.0, "Debit")
+
+    def add_transaction():
+        ledger.add("bench", 1.0, "Debit")
+        query.refresh()
+        query.rows(max(0, len(query) - 8), len(query))
+        chart.update(ledger.reports.samples())
+        ledger.disposable_balance()
+
+    def update_graph():
+        ledger.add("bench", 1.0, "Credit")
+        chart.update(ledger.reports.samples())
+
+    def first_render():
+        OffscreenChart().update(ledger.reports.samples())
+
+    def view_history():
+        query.refresh()
+        query.rows(0, 40)
+
+    def view_history_sorted():
+        query.kind = DEBIT
+        query.sort_column = "Amount"
+        query.descending = True
+        query.refresh()
+        query.rows(0, 40)
+        query.kind = query.sort_column = None
+        query.descending = False
+
+    def export_data():
+        ledger.export(export_path)
+
+    def get_disposable_balance():
+        ledger.disposable_balance()
+
+    operations = [
+        ("load", load), ("save_transaction", save_transaction), ("add_transaction", add_transaction),
+        ("update_graph", update_graph), ("first_render", first_render), ("view_history", view_history),
+        ("view_history_sorted", view_history_sorted), ("export_data", export_data),
+        ("get_disposable_balance", get_disposable_balance)
+    ]
+    return operations, ledger.close
+
+
+def display_operations(data_dir):
+    import ttkbootstrap as ttk
+    from tkinter import filedialog, messagebox
+    filedialog.asksaveasfilename = lambda *args, **kwargs: os.path.join(data_dir, "export.json")
+    for name in ("showinfo", "showerror", "showwarning"):
+        setattr(messagebox, name, lambda *args, **kwargs: None)
+    messagebox.askyesno = lambda *args, **kwargs: True
+    os.chdir(data_dir)
+    import wallet
+
+    root = ttk.Window(themename="default")
+    app = wallet.WalletApp(root)
+    root.update()
+    app.switch_view("Transactions")
+    root.update()
+
+    def settle():
+        # Chart renders and exports finish on the worker thread
+        root.update()
+        while app.worker.outstanding or app.export_worker is not None and app.export_worker.outstanding:
+            time.sleep(0.001)
+            root.update()
+
+    def save_transaction():
+        app.category_entry.set("bench")
+        app.amount_entry.delete(0, "end")
+        app.amount_entry.insert(0, "1")
+        app.debit_var.set(True)
+        app.save_transaction()
+        root.update()
+
+    def add_transaction():
+        app.add_transaction("bench", 1.0, "Debit")
+        root.update()
+
+    def update_graph():
+        app.switch_view("Reports")
+        app.ledger.add("bench", 1.0, "Credit")
+        app.update_graph()
+        settle()
+
+    def view_history():
+        app.view_history()
+        root.update()
+
+    def export_data():
+        app.export_data()
+        settle()
+
+    def get_disposable_balance():
+        app.get_disposable_balance()
+
+    def close():
+        if app.export_worker is not None:
+            app.export_worker.close()
+        app.worker.close()
+        app.ledger.close()
+        root.destroy()
+
+    operations = [
+        ("save_transaction", save_transaction), ("add_transaction", add_transaction),
+        ("update_graph", update_graph), ("view_history", view_history),
+        ("export_data", export_data), ("get_disposable_balance", get_disposable_balance)
+    ]
+    return operations, close
+
+
+def run(sizes, display, max_repeat, budget, only):
+    results = []
+    cwd = os.getcwd()
+    for size in sizes:
+        data_dir = tempfile.mkdtemp(prefix=f"wallet-bench-{size}-")
+        try:
+            make_ledger(data_dir, size)
+            operations, close = (display_operations if display else headless_operations)(data_dir)
+            try:
+                for name, fn in operations:
+                    if only and name not in only:
+                        continue
+                    result = {"mode": "display" if display else "headless", "size": size, "operation": name}
+                    result.update(measure(fn, max_repeat, budget))
+                    results.append(result)
+                    print(f"{size:>9} {name:<24} median {result['median_ms']:>10.3f} ms   "
+                          f"min {result['min_ms']:>10.3f} ms   peak {result['peak_kb']:>10.1f} KiB   x{result['repeat']}")
+            finally:
+                close()
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, "r") as f:
+        baseline = {(r["mode"], r["size"], r["operation"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get((result["mode"], result["size"], result["operation"]))
+        if old is None or not old["median_ms"]:
+            continue
+        ratio = result["median_ms"] / old["median_ms"]
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['size']:>9} {result['operation']:<24} {old['median_ms']:.3f} -> "
+                  f"{result['median_ms']:.3f} ms (x{ratio:.2f})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the wallet transaction hot path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--display", action="store_true", help="drive the real Tk WalletApp (needs a display, e.g. xvfb-run)")
+    parser.add_argument("--repeat", type=int, default=20, help="maximum timed runs per operation")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds per operation before repeats stop")
+    parser.add_argument("--only", nargs="+", help="operations to run")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.25, help="median slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.display, args.repeat, args.budget, args.only)
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": sys.version.split()[0],
+                "numpy": np.__version__,
+                "platform": platform.platform()
+            },
+            "results": results
+        }, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import tkinter as tk
+from PIL import Image, ImageTk
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+SERIES = (
+    ("Credit", '#10b981'),
+    ("Debit", '#ef4444'),
+    ("Net Balance", '#3b82f6'),
+)
+
+
+class OffscreenChart:
+    # One persistent figure for the Reports view, plotting cumulative credit, debit and balance
+    # against date. The points come from BalanceIndex.samples(), so a date range costs the same to
+    # draw however long the history is. When new data still fits the current axes only the lines
+    # are redrawn over a saved background (blitting); otherwise the limits are reset, with headroom
+    # when following the whole history so the following appends blit again.
+    # It is drawn into an Agg buffer, so a worker thread can render it while Tk keeps handling
+    # input. The figure belongs to whichever thread renders it; only the finished RGBA frame
+    # crosses over to Tk, where ChartImage shows it.
+    def __init__(self, marker_limit=100):
+        self.marker_limit = marker_limit
+        self.figure = Figure(figsize=(8, 4))
+        self.ax = self.figure.add_subplot()
+        self.lines = [self.ax.plot([], [], label=label, color=color, marker='o', animated=True)[0]
+                      for label, color in SERIES]
+        self.view = None
+        self.background = None
+        self.decorated = False
+
+        self.figure.patch.set_facecolor('#1e293b')
+        self.ax.set_facecolor('#1e293b')
+        self.ax.tick_params(colors='#ffffff')
+        self.ax.spines['bottom'].set_color('#ffffff')
+        self.ax.spines['left'].set_color('#ffffff')
+        self.ax.spines['top'].set_color('#1e293b')
+        self.ax.spines['right'].set_color('#1e293b')
+
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def _decorate(self):
+        locator = AutoDateLocator()
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+        self.ax.set_xlabel("Date")
+        self.ax.set_ylabel("Amount")
+        self.ax.set_title("Transaction Trends")
+        self.ax.legend(handles=self.lines)
+        self.ax.grid(True, color='#2d3748', linestyle='--', alpha=0.7)
+        self.decorated = True
+
+    def update(self, samples, view=None):
+        # samples is (times, credit, debit, balance) in paise; view is the (start, end) date range
+        # on screen, or None to follow the whole history
+        times, credit, debit, balance = samples
+        if not len(times):
+            return
+        if not self.decorated:
+            self._decorate()
+        x = times / 86400  # matplotlib date numbers: days since 1970-01-01
+        marker = 'o' if len(x) <= self.marker_limit else ''
+        lows, highs = [], []
+        for line, values in zip(self.lines, (credit, debit, balance)):
+            y = values / 100
+            line.set_data(x, y)
+            line.set_marker(marker)
+            lows.append(y.min())
+            highs.append(y.max())
+        x_min, x_max = (x[0], x[-1]) if view is None else (view[0] / 86400, view[1] / 86400)
+        if view == self.view and self.background is not None and self._fits(x_min, x_max, min(lows), max(highs)):
+            self._blit()
+        else:
+            self.view = view
+            self._rescale(x_min, x_max, min(lows), max(highs), follow=view is None)
+            self.canvas.draw_idle()
+
+    def _fits(self, x_min, x_max, y_min, y_max):
+        x0, x1 = self.ax.get_xlim()
+        y0, y1 = self.ax.get_ylim()
+        return x0 <= x_min and x_max <= x1 and y0 <= y_min and y_max <= y1
+
+    def _rescale(self, x_min, x_max, y_min, y_max, follow):
+        # Headroom when following the history so the next appends still fit and can be blitted
+        span = max(y_max - y_min, 1)
+        if follow:
+            days = max(x_max - x_min, 1)
+            self.ax.set_xlim(x_min - days * 0.02, x_max + days * 0.25)
+        else:
+            self.ax.set_xlim(x_min, x_max)
+        self.ax.set_ylim(y_min - span * 0.25, y_max + span * 0.25)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for line in self.lines:
+            self.ax.draw_artist(line)
+        self.canvas.blit(self.figure.bbox)
+
+    def _blit(self):
+        self.canvas.restore_region(self.background)
+        self._draw_lines()
+
+
+    def render(self, samples, view, width, height):
+        # samples are computed on the Tk thread and handed over, so the worker never reads the ledger
+        dpi = self.figure.dpi
+        if (round(self.figure.get_figwidth() * dpi), round(self.figure.get_figheight() * dpi)) != (width, height):
+            self.figure.set_size_inches(width / dpi, height / dpi)
+            self.background = None
+        self.update(samples, view)
+        if self.background is None:
+            self.canvas.draw()
+        width, height = self.canvas.get_width_height(physical=True)
+        return width, height, bytes(self.canvas.buffer_rgba())
+
+
+class ChartImage:
+    # Tk side of OffscreenChart: a plain canvas showing the latest frame. on_resize is called when
+    # the canvas changes size so a frame at the new size can be requested.
+    def __init__(self, master, on_resize, width=800, height=400):
+        self.size = (width, height)
+        self.on_resize = on_resize
+        self.photo = None
+        self.canvas = tk.Canvas(master, width=width, height=height, highlightthickness=0, background='#1e293b')
+        self.canvas.pack(fill="both", expand=True)
+        self.item = self.canvas.create_image(0, 0, anchor="nw")
+        self.canvas.bind("<Configure>", self._on_configure)
+
+    def _on_configure(self, event):
+        size = (max(event.width, 1), max(event.height, 1))
+        if size != self.size:
+            self.size = size
+            self.on_resize()
+
+    def show(self, frame):
+        width, height, data = frame
+        image = Image.frombuffer("RGBA", (width, height), data, "raw", "RGBA", 0, 1)
+        self.photo = ImageTk.PhotoImage(image)
+        self.canvas.itemconfigure(self.item, image=self.photo)
@@ -0,0 +1,310 @@
+import argparse
+import sys
+import time
+from core import Ledger, TransactionRejected, WalletLocked
+from ingest import IngestServer, apply_to_ledger, is_loopback
+from ledger import HistoryQuery, SpendIndex, TYPE_CODES, format_timestamp, parse_date, to_rupees
+from ledger_file import json_to_ledger_file, ledger_file_to_json
+from recurring import RecurringSchedule
+
+
+def date_arg(value):
+    # argparse type for YYYY-MM-DD options, so a bad date is a usage error rather than a traceback
+    try:
+        parse_date(value + " 00:00:00")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+    return value
+
+
+def loopback_arg(value):
+    # argparse type for serve --host: the API has no place on other interfaces
+    if not is_loopback(value):
+        raise argparse.ArgumentTypeError(f"'{value}' is not a loopback address; use 127.0.0.1, ::1 or localhost")
+    return value
+
+
+def add_command(ledger, args):
+    transaction_type = args.type.capitalize()
+    try:
+        warnings = ledger.check(transaction_type, args.amount)
+    except TransactionRejected as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if warnings and not args.force:
+        for warning in warnings:
+            print(f"Warning: {warning} Use --force to add it anyway.", file=sys.stderr)
+        return 1
+    ledger.add(args.category, args.amount, transaction_type)
+    print(f"{transaction_type} transaction of ₹{args.amount} for {args.category} added. Balance: ₹{ledger.balance}")
+    if ledger.is_low_balance():
+        print(f"Warning: your balance is below ₹{ledger.LOW_BALANCE_LIMIT}!", file=sys.stderr)
+    return 0
+
+
+def import_command(ledger, args):
+    started = time.perf_counter()
+    try:
+        importer, steps = ledger.importer(args.file, chunk_size=args.chunk_size)
+        for progress in steps:
+            if not args.quiet:
+                print(f"\r{progress * 100:5.1f}%  imported {importer.imported}, rejected {importer.rejected}",
+                      end="", file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(file=sys.stderr)
+    for number, reason in importer.rejects[:args.show_rejects]:
+        print(f"Row {number}: {reason}", file=sys.stderr)
+    print(f"Imported {importer.imported} transactions, rejected {importer.rejected} "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+def balance_command(ledger, args):
+    if args.on:
+        print(f"Balance at end of {args.on}: ₹{ledger.reports.balance_at(parse_date(args.on + ' 23:59:59'))}")
+        return 0
+    if args.start or args.end:
+        span = ledger.reports.time_span() or (0, 0)
+        start = parse_date(args.start + " 00:00:00") if args.start else span[0]
+        end = parse_date(args.end + " 00:00:00") + 86400 if args.end else span[1] + 1
+        credit, debit, net = ledger.reports.flow_between(start, end)
+        print(f"Credit: ₹{credit}  Debit: ₹{debit}  Net flow: ₹{net}")
+        return 0
+    print(f"Total Balance: ₹{ledger.balance}")
+    print(f"Disposable Balance: ₹{ledger.disposable_balance()}")
+    print(f"Spent today: ₹{ledger.daily_debit()}")
+    print(f"Spent this month: ₹{ledger.monthly_debit()}")
+    return 0
+
+
+def history_command(ledger, args):
+    query = HistoryQuery(ledger.transactions)
+    query.kind = TYPE_CODES[args.type.capitalize()] if args.type else None
+    if args.category:
+        query.category = ledger.transactions.find_category(args.category)
+        if query.category is None:
+            return 0
+    query.start = parse_date(args.start + " 00:00:00") if args.start else None
+    query.end = parse_date(args.end + " 00:00:00") + 86400 if args.end else None
+    query.sort_column = args.sort
+    query.descending = args.descending
+    query.refresh()
+    start = max(0, len(query) - args.limit) if args.sort is None and not args.descending else 0
+    for row in query.rows(start, min(len(query), start + args.limit)):
+        print("  ".join((row[0], f"{row[1]:<6}", f"{row[2]:<20}", row[3])))
+    return 0
+
+
+def report_command(ledger, args):
+    reports = ledger.reports
+    if args.by == "budget":
+        print(f"{'Category':<20}{'Budget':>14}{'Spent':>14}{'Remaining':>14}{'Used':>8}")
+        for category, budget, spent, remaining, used in reports.budget_vs_actual(ledger.regular_categories):
+            print(f"{category:<20}{budget:>14.2f}{spent:>14.2f}{remaining:>14.2f}{used:>8.0%}")
+        return 0
+    if args.by == "top":
+        for rank, (category, spent, share) in enumerate(reports.top_categories(args.top), 1):
+            print(f"{rank:>3}. {category:<20}{spent:>16.2f}{share:>8.1%}")
+        return 0
+    if args.by == "burn":
+        burn = reports.burn_rate()
+        print(f"Spent today: ₹{burn['today']:.2f}")
+        print(f"Average per day (last {burn['window']} days): ₹{burn['window_rate']:.2f}")
+        print(f"Spent this month: ₹{burn['month_spent']:.2f} (₹{burn['month_rate']:.2f}/day)")
+        print(f"Projected month total: ₹{burn['projected_month']:.2f}")
+        return 0
+    index = SpendIndex()
+    index.rebuild(ledger.transactions)
+    if args.by == "category":
+        buckets = {ledger.transactions.categories[code]: totals for code, totals in index.by_category.items()}
+    elif args.by == "day":
+        buckets = {time.strftime("%Y-%m-%d", time.gmtime(day * 86400)): totals for day, totals in index.by_day.items()}
+    else:
+        buckets = {f"{1970 + month // 12}-{month % 12 + 1:02d}": totals for month, totals in index.by_month.items()}
+    print(f"{args.by.capitalize():<20}{'Credit':>16}{'Debit':>16}{'Net':>16}")
+    for key in sorted(buckets):
+        credit, debit = buckets[key]
+        print(f"{key:<20}{to_rupees(credit):>16.2f}{to_rupees(debit):>16.2f}{to_rupees(credit - debit):>16.2f}")
+    return 0
+
+
+def export_command(ledger, args):
+    started = time.perf_counter()
+    category = None
+    if args.category:
+        category = ledger.transactions.find_category(args.category)
+        # An unknown category matches nothing
+        category = -1 if category is None else category
+    filters = {
+        "kind": TYPE_CODES[args.type.capitalize()] if args.type else None,
+        "category": category,
+        "start": parse_date(args.start + " 00:00:00") if args.start else None,
+        "end": parse_date(args.end + " 00:00:00") + 86400 if args.end else None
+    }
+    try:
+        exporter = ledger.exporter(args.path, **filters)
+        for progress in exporter.run():
+            if not args.quiet:
+                print(f"\r{progress * 100:5.1f}%  exported {exporter.exported}", end="", file=sys.stderr)
+    except (ValueError, OSError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Exported {exporter.exported} transactions to {exporter.path} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+def serve_command(ledger, args):
+    server = IngestServer(lambda posts: apply_to_ledger(ledger, posts), host=args.host, port=args.port,
+                          path=args.socket, token=args.token)
+    print(f"Accepting transactions on {args.socket or f'http://{args.host}:{args.port}'}; Ctrl+C to stop", file=sys.stderr)
+    try:
+        server.run()
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    ledger.sync()
+    print(f"Balance: ₹{ledger.balance}")
+    return 0
+
+
+def recurring_command(ledger, args):
+    schedule = RecurringSchedule(ledger)
+    try:
+        if args.set:
+            if not args.type or args.day is None:
+                raise ValueError("--set needs --type and --day")
+            if args.set not in ledger.regular_categories:
+                raise ValueError(f"'{args.set}' is not a regular category")
+            schedule.set(args.set, args.type.capitalize(), args.day, args.every)
+        if args.remove:
+            schedule.remove(args.remove)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.apply:
+        results = schedule.apply()
+        for (category, amount, transaction_type, ts), error in results:
+            if error is not None:
+                print(f"Skipped {transaction_type.lower()} of ₹{amount} for {category} due {format_timestamp(ts)}: {error}",
+                      file=sys.stderr)
+        print(f"Posted {sum(error is None for _, error in results)} recurring transactions. Balance: ₹{ledger.balance}")
+    for category, entry in sorted(schedule.entries.items()):
+        every = "month" if entry["every"] == 1 else f"{entry['every']} months"
+        print(f"{category:<20}{entry['type']:<8}₹{ledger.regular_categories.get(category, 0):<12} "
+              f"day {entry['day']} every {every}, next {entry['next'][:10]}")
+    return 0
+
+
+def convert_command(args):
+    started = time.perf_counter()
+    try:
+        if args.source.lower().endswith(".bin"):
+            count = ledger_file_to_json(args.source, args.target)
+            print(f"Wrote {count} transactions to {args.target} in {time.perf_counter() - started:.2f}s")
+        else:
+            count, rejected = json_to_ledger_file(args.source, args.target)
+            print(f"Wrote {count} transactions to {args.target}, rejected {rejected} "
+                  f"in {time.perf_counter() - started:.2f}s")
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="wallet", description="Budget tracker ledger without the GUI")
+    parser.add_argument("--data-dir", default=".", help="directory holding settings.json and the ledger files")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a credit or debit")
+    add.add_argument("type", choices=["credit", "debit"])
+    add.add_argument("amount", type=float)
+    add.add_argument("category")
+    add.add_argument("--force", action="store_true", help="add even if the daily limit warning fires")
+    add.set_defaults(handler=add_command)
+
+    imp = commands.add_parser("import", help="import a CSV, JSON or JSONL bank statement")
+    imp.add_argument("file")
+    imp.add_argument("--chunk-size", type=int, default=10000)
+    imp.add_argument("--show-rejects", type=int, default=20, help="number of rejected rows to list")
+    imp.add_argument("--quiet", action="store_true", help="no progress output")
+    imp.set_defaults(handler=import_command)
+
+    balance = commands.add_parser("balance", help="show total and disposable balance, the balance on a date or net flow")
+    balance.add_argument("--on", type=date_arg, help="balance at the end of this date (YYYY-MM-DD)")
+    balance.add_argument("--from", dest="start", type=date_arg, help="net flow from this date (YYYY-MM-DD)")
+    balance.add_argument("--to", dest="end", type=date_arg, help="net flow up to this date, inclusive")
+    balance.set_defaults(handler=balance_command)
+
+    history = commands.add_parser("history", help="list transactions")
+    history.add_argument("--limit", type=int, default=20)
+    history.add_argument("--type", choices=["credit", "debit"])
+    history.add_argument("--category")
+    history.add_argument("--from", dest="start", type=date_arg, help="start date YYYY-MM-DD")
+    history.add_argument("--to", dest="end", type=date_arg, help="end date YYYY-MM-DD, inclusive")
+    history.add_argument("--sort", choices=["Date", "Type", "Category", "Amount"])
+    history.add_argument("--descending", action="store_true")
+    history.set_defaults(handler=history_command)
+
+    report = commands.add_parser("report", help="totals per month, day or category, budget vs actual, top categories, burn rate")
+    report.add_argument("--by", choices=["month", "day", "category", "budget", "top", "burn"], default="month")
+    report.add_argument("--top", type=int, default=10, help="number of categories for --by top")
+    report.set_defaults(handler=report_command)
+
+    export = commands.add_parser("export", help="export the history as JSON, JSON Lines or CSV (add .gz to compress)")
+    export.add_argument("path", nargs="?")
+    export.add_argument("--type", choices=["credit", "debit"])
+    export.add_argument("--category")
+    export.add_argument("--from", dest="start", type=date_arg, help="start date YYYY-MM-DD")
+    export.add_argument("--to", dest="end", type=date_arg, help="end date YYYY-MM-DD, inclusive")
+    export.add_argument("--quiet", action="store_true", help="no progress output")
+    export.set_defaults(handler=export_command)
+
+    serve = commands.add_parser("serve", help="accept transactions posted over HTTP from other local tools")
+    serve.add_argument("--host", type=loopback_arg, default="127.0.0.1", help="loopback address to listen on")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    serve.add_argument("--token", help="require 'Authorization: Bearer TOKEN' on every request")
+    serve.set_defaults(handler=serve_command)
+
+    recurring = commands.add_parser("recurring", help="list, set up or post recurring credits and debits for regular categories")
+    recurring.add_argument("--set", metavar="CATEGORY", help="repeat this regular category's amount every month")
+    recurring.add_argument("--type", choices=["credit", "debit"])
+    recurring.add_argument("--day", type=int, help="day of the month it falls due (1-31)")
+    recurring.add_argument("--every", type=int, default=1, help="repeat every N months")
+    recurring.add_argument("--remove", metavar="CATEGORY", help="stop repeating this category")
+    recurring.add_argument("--apply", action="store_true", help="post every occurrence that is due")
+    recurring.set_defaults(handler=recurring_command)
+
+    convert = commands.add_parser("convert", help="convert between exported JSON and the binary ledger file (.bin)")
+    convert.add_argument("source")
+    convert.add_argument("target")
+    convert.set_defaults(handler=convert_command, standalone=True)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if getattr(args, "standalone", False):
+        # Works on files only; no wallet needs to be opened
+        return args.handler(args)
+    try:
+        ledger = Ledger(args.data_dir)
+    except WalletLocked as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    try:
+        return args.handler(ledger, args)
+    finally:
+        ledger.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import json
+import math
+import os
+import numpy as np
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+from ledger import MAX_AMOUNT, TYPE_CODES, current_timestamp, day_key, month_key, to_paise
+from storage import JournalStorage, MappedJournalStorage, SQLiteStorage
+from importer import StatementImporter
+from exporter import StatementExporter
+from reports import ReportEngine
+from rollups import Rollups
+from instrument import log, timed
+
+SETTINGS_FILE = "settings.json"
+CATEGORIES_FILE = "regular_categories.json"
+RECURRING_FILE = "recurring.json"
+EXPORT_FILE = "wallet_data.json"
+ROLLUPS_FILE = "wallet_rollups.npz"
+LOCK_FILE = "wallet.lock"
+BACKENDS = ("journal", "binary", "sqlite")
+
+
+class TransactionRejected(ValueError):
+    pass
+
+
+class WalletLocked(RuntimeError):
+    pass
+
+
+class PendingTotals:
+    # Balance change and debits per day and month of rows accepted earlier in a batch but not yet
+    # appended, so check() sees them as if they were already in the ledger. All in rupees.
+    def __init__(self):
+        self.balance = 0.0
+        self.days = {}
+        self.months = {}
+
+    def add(self, transaction_type, amount, ts):
+        if transaction_type == "Credit":
+            self.balance += amount
+            return
+        self.balance -= amount
+        day, month = day_key(ts), month_key(ts)
+        self.days[day] = self.days.get(day, 0.0) + amount
+        self.months[month] = self.months.get(month, 0.0) + amount
+
+
+class Ledger:
+    # Headless wallet core: transactions, balance, regular categories, limits and the files behind
+    # them. WalletApp and the command line both drive this class; it never touches Tk.
+    DAILY_WARNING_LIMIT = 5000
+    LOW_BALANCE_LIMIT = 2000
+
+    def __init__(self, data_dir="."):
+        self.data_dir = data_dir
+        self.lock_file = None
+        self._lock()
+        # Optional callable(key, fn, *args) that runs file writes elsewhere, e.g. a BackgroundWorker
+        self.writer = None
+        self.settings = self._read_json(SETTINGS_FILE, {})
+        self.regular_categories = self._read_json(CATEGORIES_FILE, {})
+        self.recurring = self._read_json(RECURRING_FILE, {})
+        self.daily_limit = self.settings.get("daily_limit", 0.0)
+        self.monthly_limit = self.settings.get("monthly_limit", 0.0)
+        backend = self.settings.get("storage_backend", "journal")
+        self.storage = self._open_storage(backend)
+        self._migrate(backend)
+        # Saved rollups let the balances and reports start without reading every transaction
+        rollups = Rollups.read(self.path(ROLLUPS_FILE))
+        self.transactions = self.storage.load(rollups)
+        self.reports = ReportEngine(self.transactions)
+        if rollups is not None and not rollups.matches(self.transactions):
+            rollups = None
+        if rollups is not None:
+            rollups.restore_reports(self.reports)
+        # Rows covered by the rollups file on disk; it is rewritten on close when that falls behind
+        self.saved_count = None if rollups is None else rollups.count
+
+    def path(self, name):
+        return os.path.join(self.data_dir, name)
+
+    def _lock(self):
+        # One process writes a wallet at a time. A second one (the GUI and cli.py on the same
+        # files) would append rows the first never sees, and they would be lost when the first
+        # compacts its journal or saves its rollups. The OS drops the lock if the process dies.
+        lock_file = open(self.path(LOCK_FILE), "a")
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise WalletLocked(f"The wallet in {os.path.abspath(self.data_dir)} is already open in another window "
+                               "or command. Close it and try again.")
+        self.lock_file = lock_file
+
+    def _read_json(self, name, default):
+        if not os.path.exists(self.path(name)):
+            return default
+        with open(self.path(name), "r") as f:
+            return json.load(f)
+
+    def _write_json(self, name, data):
+        # Serialized here so the writer gets a snapshot; the file itself may be written on another thread
+        text = json.dumps(data)
+        if self.writer is None:
+            self._write_text(name, text)
+        else:
+            self.writer(name, self._write_text, name, text)
+
+    def _write_text(self, name, text):
+        tmp_path = self.path(name) + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(text)
+        os.replace(tmp_path, self.path(name))
+
+    def _open_storage(self, backend, legacy=True):
+        legacy_path = self.path(EXPORT_FILE) if legacy else None
+        if backend == "sqlite":
+            return SQLiteStorage(path=self.path("wallet.db"), legacy_path=legacy_path)
+        if backend == "binary":
+            # Its own journal: close() folds the tail into wallet_ledger.bin and truncates the
+            # journal, which must not empty the journal backend's copy of the wallet
+            return MappedJournalStorage(journal_path=self.path("wallet_ledger_journal.jsonl"),
+                                        snapshot_path=self.path("wallet_ledger.bin"),
+                                        legacy_path=legacy_path)
+        return JournalStorage(journal_path=self.path("wallet_journal.jsonl"), snapshot_path=self.path("wallet_snapshot.npz"),
+                              legacy_path=legacy_path)
+
+    def _migrate(self, backend):
+        # The first time a backend is used on a wallet kept by another one, the transactions are
+        # copied across and the other backend's files get a .migrated suffix, so switching back
+        # later migrates again instead of opening the rows as they were before the switch
+        if self.storage.has_data():
+            return
+        for other in BACKENDS:
+            if other == backend:
+                continue
+            source = self._open_storage(other, legacy=False)
+            if not source.has_data():
+                continue
+            store = source.load()
+            self.storage.seed(store)
+            source.close()
+            for path in source.files():
+                if os.path.exists(path):
+                    os.replace(path, path + ".migrated")
+            log.info("Moved %d transactions from the %s backend to %s", len(store), other, backend)
+            return
+
+    @property
+    def balance(self):
+        return self.transactions.balance()
+
+    def disposable_balance(self):
+        expected_total = sum(self.regular_categories.values()) if self.regular_categories else 0
+        return max(0, self.storage.balance() - expected_total)
+
+    def daily_debit(self, ts=None):
+        return self.storage.daily_debit(current_timestamp() if ts is None else ts)
+
+    def monthly_debit(self, ts=None):
+        return self.storage.monthly_debit(current_timestamp() if ts is None else ts)
+
+    def is_low_balance(self):
+        return self.balance < self.LOW_BALANCE_LIMIT
+
+    @timed("ledger_check")
+    def check(self, transaction_type, amount, ts=None, pending=None):
+        # Raises TransactionRejected for hard failures; returns warnings the caller must confirm.
+        # pending is the PendingTotals of a batch being checked row by row.
+        if transaction_type not in TYPE_CODES:
+            raise TransactionRejected("Please select either Credit or Debit")
+        if not math.isfinite(amount):
+            raise TransactionRejected("Amount must be a number")
+        if amount > MAX_AMOUNT:
+            raise TransactionRejected(f"Amount cannot exceed ₹{MAX_AMOUNT:,}")
+        if amount <= 0:
+            raise TransactionRejected("Amount must be positive")
+        if transaction_type != "Debit":
+            return []
+        if amount > self.balance + (pending.balance if pending else 0):
+            raise TransactionRejected("Insufficient balance")
+        ts = current_timestamp() if ts is None else ts
+        monthly_total = self.monthly_debit(ts) + (pending.months.get(month_key(ts), 0) if pending else 0)
+        if self.monthly_limit > 0 and (monthly_total + amount) > self.monthly_limit:
+            raise TransactionRejected(f"Transaction exceeds monthly limit of ₹{self.monthly_limit}")
+        warnings = []
+        daily_debit_total = self.daily_debit(ts) + (pending.days.get(day_key(ts), 0) if pending else 0)
+        if (daily_debit_total + amount) > self.DAILY_WARNING_LIMIT:
+            warnings.append(f"Transaction of ₹{amount} exceeds ₹{self.DAILY_WARNING_LIMIT} daily limit. "
+                            f"Current spending: ₹{daily_debit_total}.")
+        return warnings
+
+    @timed("ledger_add")
+    def add(self, category, amount, transaction_type, ts=None):
+        ts = current_timestamp() if ts is None else ts
+        index = self.transactions.append(ts, TYPE_CODES[transaction_type], category, to_paise(amount))
+        self.storage.append(self.transactions, index)
+        return index
+
+    @timed("ledger_add_many")
+    def add_many(self, transactions, force=False):
+        # transactions: [(category, amount, transaction_type, ts or None)]. Each row gets the same
+        # checks as add() callers run, counting the rows accepted before it; rows with a warning
+        # are only accepted with force, as nobody is there to confirm them. Accepted rows are
+        # appended as one batch. Returns (index, None) or (None, reason) per row, in order.
+        pending = PendingTotals()
+        accepted = []
+        results = []
+        now = current_timestamp()
+        for category, amount, transaction_type, ts in transactions:
+            ts = now if ts is None else ts
+            try:
+                warnings = self.check(transaction_type, amount, ts, pending)
+                if warnings and not force:
+                    raise TransactionRejected(" ".join(warnings))
+            except TransactionRejected as e:
+                results.append((None, str(e)))
+                continue
+            pending.add(transaction_type, amount, ts)
+            results.append((len(self.transactions) + len(accepted), None))
+            accepted.append((ts, TYPE_CODES[transaction_type], self.transactions.category_code(category), to_paise(amount)))
+        if accepted:
+            start = len(self.transactions)
+            timestamps, kinds, codes, paise = zip(*accepted)
+            self.transactions.extend(np.array(timestamps, dtype=np.int64), np.array(kinds, dtype=np.uint8),
+                                     np.array(codes, dtype=np.int32), np.array(paise, dtype=np.int64))
+            self.storage.append_many(self.transactions, start)
+        return results
+
+    def importer(self, path, **options):
+        # Returns the importer and its step generator; run the generator to apply the statement
+        importer = StatementImporter(path, **options)
+        return importer, importer.apply(self.transactions, self.storage)
+
+    def exporter(self, path=None, count=None, **filters):
+        # Streaming exporter for the first `count` rows (default: all); run() or export() it.
+        # Filters: kind, category code, start and end timestamps.
+        return StatementExporter(self.transactions, path or self.path(EXPORT_FILE), count, **filters)
+
+    def export(self, path=None, count=None, **filters):
+        exporter = self.exporter(path, count, **filters)
+        exporter.export()
+        return exporter.path
+
+    def set_regular_categories(self, categories):
+        self.regular_categories = categories
+        self._write_json(CATEGORIES_FILE, categories)
+
+    def set_recurring(self, schedules):
+        self.recurring = schedules
+        self._write_json(RECURRING_FILE, schedules)
+
+    def set_limits(self, daily_limit, monthly_limit):
+        self.daily_limit = daily_limit
+        self.monthly_limit = monthly_limit
+        self.update_settings()
+
+    def update_settings(self, **values):
+        self.settings.update(values)
+        self.settings["daily_limit"] = self.daily_limit
+        self.settings["monthly_limit"] = self.monthly_limit
+        self.settings.setdefault("storage_backend", "journal")
+        self._write_json(SETTINGS_FILE, self.settings)
+
+    def sync(self):
+        self.storage.sync()
+
+    def save_rollups(self):
+        if self.saved_count == len(self.transactions):
+            return
+        Rollups.capture(self.reports).save(self.path(ROLLUPS_FILE))
+        self.saved_count = len(self.transactions)
+
+    def close(self):
+        self.storage.close()
+        self.save_rollups()
+        if self.lock_file is not None:
+            # Closing the file releases the lock
+            self.lock_file.close()
+            self.lock_file = None
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+import numpy as np
+from ledger import TYPE_NAMES
+
+FORMATS = ("json", "jsonl", "csv")
+
+
+def export_format(path):
+    # (format, gzipped) from the file name, e.g. history.csv.gz -> ("csv", True)
+    name = path.lower()
+    compressed = name.endswith(".gz")
+    if compressed:
+        name = name[:-3]
+    extension = os.path.splitext(name)[1].lstrip(".")
+    if extension == "ndjson":
+        extension = "jsonl"
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported export format '{extension or path}'")
+    return extension, compressed
+
+
+def _csv_field(text):
+    if any(c in text for c in ',"\r\n'):
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+class StatementExporter:
+    # Streams the ledger to JSON (the export_data layout), JSON Lines or CSV, optionally gzipped,
+    # formatting fixed-size chunks of rows straight from the columns. Only one chunk of text is
+    # held at a time. Rows can be filtered by type, category code and date range [start, end).
+    # The file is written under a temporary name and only moved into place when complete, so a
+    # cancelled or failed export leaves nothing behind.
+    def __init__(self, store, path, count=None, kind=None, category=None, start=None, end=None, chunk_size=50000):
+        self.store = store
+        self.path = path
+        self.format, self.compressed = export_format(path)
+        # count pins the rows to export, so the export can run on another thread while rows are appended
+        self.count = len(store) if count is None else count
+        self.kind = kind
+        self.category = category
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.exported = 0
+        self.done = 0
+        self.cancelled = False
+
+    @property
+    def progress(self):
+        return self.done / self.count if self.count else 1.0
+
+    def cancel(self):
+        self.cancelled = True
+
+    def _open(self, path):
+        if self.compressed:
+            return gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+        return open(path, "w", encoding="utf-8", newline="")
+
+    def _chunk(self, lo, hi):
+        # Column slices of the rows in [lo, hi) that pass the filters
+        store = self.store
+        ts = store.timestamps[lo:hi]
+        kinds = store.kinds[lo:hi]
+        codes = store.category_codes[lo:hi]
+        amounts = store.amounts[lo:hi]
+        mask = None
+        for active, condition in ((self.kind is not None, lambda: kinds == self.kind),
+                                  (self.category is not None, lambda: codes == self.category),
+                                  (self.start is not None, lambda: ts >= self.start),
+                                  (self.end is not None, lambda: ts < self.end)):
+            if active:
+                mask = condition() if mask is None else mask & condition()
+        if mask is not None:
+            ts, kinds, codes, amounts = ts[mask], kinds[mask], codes[mask], amounts[mask]
+        if not len(ts):
+            return [], [], [], []
+        dates = np.char.replace(np.datetime_as_string(ts.astype("datetime64[s]")), "T", " ")
+        return dates.tolist(), kinds.tolist(), codes.tolist(), (amounts / 100).tolist()
+
+    def _format(self, categories, dates, kinds, codes, amounts):
+        if self.format == "csv":
+            return "".join(f"{date},{TYPE_NAMES[kind]},{categories[code]},{amount!r}\r\n"
+                           for date, kind, code, amount in zip(dates, kinds, codes, amounts))
+        if self.format == "jsonl":
+            return "".join(f'{{"type": "{TYPE_NAMES[kind]}", "category": {categories[code]}, "amount": {amount!r}, "date": "{date}"}}\n'
+                           for date, kind, code, amount in zip(dates, kinds, codes, amounts))
+        # Same text json.dump(records, indent=4) produces, one item at a time
+        return ",".join(f'\n    {{\n        "type": "{TYPE_NAMES[kind]}",\n        "category": {categories[code]},\n'
+                        f'        "amount": {amount!r},\n        "date": "{date}"\n    }}'
+                        for date, kind, code, amount in zip(dates, kinds, codes, amounts))
+
+    def run(self):
+        # Generator: writes one chunk per step and yields progress in [0, 1]
+        encode = _csv_field if self.format == "csv" else json.dumps
+        categories = [encode(c) for c in self.store.categories]
+        tmp_path = self.path + ".tmp"
+        try:
+            with self._open(tmp_path) as f:
+                if self.format == "csv":
+                    f.write("date,type,category,amount\r\n")
+                elif self.format == "json":
+                    f.write("[")
+                for lo in range(0, self.count, self.chunk_size):
+                    if self.cancelled:
+                        break
+                    hi = min(lo + self.chunk_size, self.count)
+                    dates, kinds, codes, amounts = self._chunk(lo, hi)
+                    if dates:
+                        if self.format == "json" and self.exported:
+                            f.write(",")
+                        f.write(self._format(categories, dates, kinds, codes, amounts))
+                        self.exported += len(dates)
+                    self.done = hi
+                    yield self.progress
+                if self.format == "json":
+                    f.write("\n]" if self.exported else "]")
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        if self.cancelled:
+            os.remove(tmp_path)
+            return
+        os.replace(tmp_path, self.path)
+        yield 1.0
+
+    def export(self):
+        # Runs the whole export; returns the number of rows written
+        for _ in self.run():
+            pass
+        return self.exported
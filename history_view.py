@@ -0,0 +1,148 @@
+import ttkbootstrap as ttk
+from ttkbootstrap.tooltip import ToolTip
+from ledger import HistoryQuery, TYPE_CODES, parse_date
+from instrument import timed
+
+COLUMNS = (("Date", 200), ("Type", 100), ("Category", 150), ("Amount", 100))
+ALL = "All"
+
+
+class VirtualHistoryView:
+    # Windowed Treeview over the ledger: a fixed set of items is recycled as the user scrolls, and
+    # row tuples are paged in from the store around the window (plus overscan) on demand.
+    def __init__(self, master, store, rows=8, overscan=32):
+        self.store = store
+        self.query = HistoryQuery(store)
+        self.rows = rows
+        self.overscan = overscan
+        self.first = 0
+        self.cache_start = 0
+        self.cache = []
+
+        filter_bar = ttk.Frame(master)
+        filter_bar.pack(side="top", fill="x", padx=5, pady=5)
+        ttk.Label(filter_bar, text="Type:").pack(side="left", padx=(0, 5))
+        self.type_filter = ttk.Combobox(filter_bar, values=[ALL, "Credit", "Debit"], width=8, state="readonly", bootstyle="dark")
+        self.type_filter.set(ALL)
+        self.type_filter.pack(side="left", padx=5)
+        ttk.Label(filter_bar, text="Category:").pack(side="left", padx=5)
+        self.category_filter = ttk.Combobox(filter_bar, values=[ALL], width=14, state="readonly", bootstyle="dark")
+        self.category_filter.set(ALL)
+        self.category_filter.pack(side="left", padx=5)
+        ttk.Label(filter_bar, text="From:").pack(side="left", padx=5)
+        self.start_filter = ttk.Entry(filter_bar, width=11, bootstyle="dark")
+        self.start_filter.pack(side="left", padx=5)
+        ToolTip(self.start_filter, text="Start date (YYYY-MM-DD)", bootstyle="inverse")
+        ttk.Label(filter_bar, text="To:").pack(side="left", padx=5)
+        self.end_filter = ttk.Entry(filter_bar, width=11, bootstyle="dark")
+        self.end_filter.pack(side="left", padx=5)
+        ToolTip(self.end_filter, text="End date (YYYY-MM-DD), inclusive", bootstyle="inverse")
+        for combo in (self.type_filter, self.category_filter):
+            combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filters())
+        for entry in (self.start_filter, self.end_filter):
+            entry.bind("<Return>", lambda e: self.apply_filters())
+
+        self.v_scrollbar = ttk.Scrollbar(master, orient="vertical", command=self.on_scrollbar)
+        self.v_scrollbar.pack(side="right", fill="y", padx=0, pady=0)
+        self.h_scrollbar = ttk.Scrollbar(master, orient="horizontal")
+        self.h_scrollbar.pack(side="bottom", fill="x", padx=0, pady=0)
+
+        self.tree = ttk.Treeview(master, columns=[name for name, _ in COLUMNS], show="headings", height=rows, bootstyle="dark")
+        for name, width in COLUMNS:
+            self.tree.heading(name, text=name, anchor="center", command=lambda c=name: self.sort_by(c))
+            self.tree.column(name, width=width, anchor="center")
+        self.tree.pack(fill="both", expand=True, padx=0, pady=0)
+        self.tree.configure(xscrollcommand=self.h_scrollbar.set)
+        self.h_scrollbar.configure(command=self.tree.xview)
+        self.items = [self.tree.insert("", "end") for _ in range(rows)]
+
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll_to(self.first - 3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_to(self.first + 3))
+        self.refresh()
+
+    def _parse_day(self, entry):
+        value = entry.get().strip()
+        if not value:
+            entry.configure(bootstyle="dark")
+            return None
+        try:
+            ts = parse_date(value + " 00:00:00")
+        except ValueError:
+            entry.configure(bootstyle="danger")
+            return None
+        entry.configure(bootstyle="dark")
+        return ts
+
+    def apply_filters(self):
+        kind = self.type_filter.get()
+        category = self.category_filter.get()
+        self.query.kind = None if kind == ALL else TYPE_CODES[kind]
+        self.query.category = None if category == ALL else self.store.find_category(category)
+        self.query.start = self._parse_day(self.start_filter)
+        end = self._parse_day(self.end_filter)
+        self.query.end = None if end is None else end + 86400
+        self.first = 0
+        self.refresh(follow=False)
+
+    def sort_by(self, column):
+        if self.query.sort_column == column:
+            self.query.descending = not self.query.descending
+        else:
+            self.query.sort_column = column
+            self.query.descending = False
+        for name, _ in COLUMNS:
+            arrow = (" ▼" if self.query.descending else " ▲") if name == column else ""
+            self.tree.heading(name, text=name + arrow)
+        self.first = 0
+        self.refresh(follow=False)
+
+    @timed("history_refresh")
+    def refresh(self, follow=True):
+        # Re-run the query after the ledger or filters change; keep the view pinned to the
+        # newest rows if it was already showing them.
+        old_size = len(self.query)
+        at_end = self.first + self.rows >= old_size
+        self.query.refresh()
+        self.cache = []
+        self.category_filter.configure(values=[ALL] + sorted(self.store.categories))
+        if follow and at_end:
+            self.first = len(self.query) - self.rows
+        self.scroll_to(self.first)
+
+    def on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(value) * len(self.query)))
+        elif action == "scroll":
+            step = int(value) * (self.rows if unit == "pages" else 1)
+            self.scroll_to(self.first + step)
+
+    def on_mousewheel(self, event):
+        step = -1 if event.delta > 0 else 1
+        self.scroll_to(self.first + step * max(1, abs(event.delta) // 120) * 3)
+
+    def scroll_to(self, first):
+        n = len(self.query)
+        self.first = max(0, min(first, n - self.rows))
+        self.render()
+
+    def _window(self, start, end):
+        if start < self.cache_start or end > self.cache_start + len(self.cache):
+            self.cache_start = max(0, start - self.overscan)
+            self.cache = self.query.rows(self.cache_start, min(len(self.query), end + self.overscan))
+        return self.cache[start - self.cache_start:end - self.cache_start]
+
+    def render(self):
+        n = len(self.query)
+        end = min(self.first + self.rows, n)
+        window = self._window(self.first, end)
+        for slot, item in enumerate(self.items):
+            if slot < len(window):
+                self.tree.item(item, values=window[slot])
+                self.tree.reattach(item, "", slot)
+            else:
+                self.tree.detach(item)
+        if n:
+            self.v_scrollbar.set(self.first / n, end / n)
+        else:
+            self.v_scrollbar.set(0, 1)
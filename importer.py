@@ -0,0 +1,207 @@
+import calendar
+import codecs
+import csv
+import functools
+import json
+import math
+import os
+import time
+import numpy as np
+from ledger import CREDIT, DEBIT, MAX_AMOUNT, to_paise
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y", "%d-%m-%Y")
+TYPE_ALIASES = {"credit": CREDIT, "cr": CREDIT, "c": CREDIT, "debit": DEBIT, "dr": DEBIT, "d": DEBIT}
+DEFAULT_CATEGORY = "imported"
+MISSING = object()
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse_date_text(value):
+    for fmt in DATE_FORMATS:
+        try:
+            return calendar.timegm(time.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{value}'")
+
+
+def parse_statement_date(value):
+    # Statements repeat the same dates many times, so parsed values are cached
+    return _parse_date_text(str(value).strip())
+
+
+@functools.lru_cache(maxsize=256)
+def _field_names(keys):
+    # Maps lower-cased column names to the statement's own spelling; rows share a handful of key sets
+    return {str(k).strip().lower(): k for k in keys if k is not None}
+
+
+def normalize_row(row):
+    # Returns (wall-clock timestamp, type code, category, paise) or raises ValueError with the reason
+    names = _field_names(tuple(row))
+    date = row.get(names.get("date", MISSING))
+    if date in (None, ""):
+        raise ValueError("missing date")
+    amount_value = row.get(names.get("amount", MISSING))
+    if amount_value in (None, ""):
+        raise ValueError("missing amount")
+    try:
+        if isinstance(amount_value, (int, float)) and not isinstance(amount_value, bool):
+            amount = float(amount_value)
+        else:
+            amount = float(str(amount_value).replace(",", "").replace("₹", "").strip())
+    except ValueError:
+        raise ValueError(f"invalid amount '{amount_value}'")
+    if not math.isfinite(amount) or abs(amount) > MAX_AMOUNT:
+        raise ValueError(f"invalid amount '{amount_value}'")
+    type_value = str(row.get(names.get("type", MISSING)) or "").strip().lower()
+    if type_value:
+        if type_value not in TYPE_ALIASES:
+            raise ValueError(f"invalid type '{type_value}'")
+        if amount < 0:
+            raise ValueError("negative amount")
+        kind = TYPE_ALIASES[type_value]
+    else:
+        # No type column: signed amounts, negative means money out
+        kind = DEBIT if amount < 0 else CREDIT
+        amount = abs(amount)
+    paise = to_paise(amount)
+    if paise == 0:
+        raise ValueError("zero amount")
+    category = str(row.get(names.get("category", MISSING)) or "").strip() or DEFAULT_CATEGORY
+    return parse_statement_date(date), kind, category, paise
+
+
+class StatementImporter:
+    # Streams a CSV, JSON array or JSON Lines statement through generators, normalizes rows in
+    # fixed-size chunks and appends each chunk to the ledger as one column batch. Only the current
+    # chunk is held in memory, whatever the file size.
+    def __init__(self, path, chunk_size=10000, max_rejects=1000):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.max_rejects = max_rejects
+        self.size = os.path.getsize(path)
+        self.bytes_read = 0
+        self.imported = 0
+        self.rejected = 0
+        self.rejects = []
+
+    @property
+    def progress(self):
+        return self.bytes_read / self.size if self.size else 1.0
+
+    def _lines(self, f):
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        for line in f:
+            self.bytes_read += len(line)
+            yield decoder.decode(line)
+
+    def _csv_rows(self, f):
+        reader = csv.DictReader(self._lines(f))
+        for row in reader:
+            yield reader.line_num, row
+
+    def _jsonl_rows(self, f):
+        for number, line in enumerate(self._lines(f), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                self._reject(number, "invalid JSON")
+                continue
+            yield number, row
+
+    def _json_rows(self, f, block_size=1 << 16, max_item_size=1 << 24):
+        # Incremental parse of a top-level JSON array, one object at a time
+        decoder = json.JSONDecoder()
+        text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        buffer = ""
+        pos = 0
+        started = False
+        number = 0
+        eof = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if not started and pos < len(buffer):
+                if buffer[pos] != "[":
+                    raise ValueError("expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if started and pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError("need more data")
+                item, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    if buffer[pos:].strip():
+                        raise ValueError("truncated JSON array")
+                    return
+                if len(buffer) - pos > max_item_size:
+                    raise ValueError(f"malformed JSON near byte {self.bytes_read}")
+                chunk = f.read(block_size)
+                self.bytes_read += len(chunk)
+                eof = not chunk
+                buffer = buffer[pos:] + text_decoder.decode(chunk, final=eof)
+                pos = 0
+                continue
+            number += 1
+            pos = end
+            yield number, item
+
+    def rows(self):
+        extension = os.path.splitext(self.path)[1].lower()
+        with open(self.path, "rb") as f:
+            if extension == ".csv":
+                yield from self._csv_rows(f)
+            elif extension in (".jsonl", ".ndjson"):
+                yield from self._jsonl_rows(f)
+            elif extension == ".json":
+                yield from self._json_rows(f)
+            else:
+                raise ValueError(f"Unsupported statement format '{extension}'")
+
+    def _reject(self, number, reason):
+        self.rejected += 1
+        if len(self.rejects) < self.max_rejects:
+            self.rejects.append((number, reason))
+
+    def chunks(self, store):
+        # Yields (timestamps, kinds, category codes, paise) arrays of up to chunk_size valid rows
+        columns = ([], [], [], [])
+        for number, row in self.rows():
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("not an object")
+                ts, kind, category, paise = normalize_row(row)
+            except ValueError as e:
+                self._reject(number, str(e))
+                continue
+            columns[0].append(ts)
+            columns[1].append(kind)
+            columns[2].append(store.category_code(category))
+            columns[3].append(paise)
+            if len(columns[0]) >= self.chunk_size:
+                yield self._arrays(columns)
+                columns = ([], [], [], [])
+        if columns[0]:
+            yield self._arrays(columns)
+
+    def _arrays(self, columns):
+        return (np.array(columns[0], dtype=np.int64), np.array(columns[1], dtype=np.uint8),
+                np.array(columns[2], dtype=np.int32), np.array(columns[3], dtype=np.int64))
+
+    def apply(self, store, storage):
+        # Generator: appends one chunk per step and yields progress in [0, 1]
+        for timestamps, kinds, codes, paise in self.chunks(store):
+            start = len(store)
+            store.extend(timestamps, kinds, codes, paise)
+            storage.append_many(store, start)
+            self.imported += len(timestamps)
+            yield self.progress
+        storage.sync()
+        yield 1.0
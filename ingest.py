@@ -0,0 +1,371 @@
+import asyncio
+import http.client
+import ipaddress
+import json
+import math
+import socket
+import threading
+from importer import DEFAULT_CATEGORY, TYPE_ALIASES, parse_statement_date
+from ledger import TYPE_NAMES
+from instrument import log, metrics
+
+MAX_BODY = 8 << 20
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def is_loopback(host):
+    # True for localhost and loopback addresses such as 127.0.0.1 or ::1 (brackets allowed)
+    host = host.strip("[]").lower()
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def local_host_header(value):
+    # Whether a Host header names this machine: a loopback host with or without a port
+    host = value.strip()
+    if host.startswith("["):
+        host = host[:host.find("]") + 1]
+    elif host.count(":") == 1:
+        host = host.partition(":")[0]
+    return bool(host) and is_loopback(host)
+
+
+class BadRequest(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_transaction(item):
+    # {"type": "debit", "amount": 250, "category": "groceries", "date": "2025-07-01 09:30"} ->
+    # (category, amount, transaction type, ts or None). The date is optional and defaults to now.
+    if not isinstance(item, dict):
+        raise ValueError("not an object")
+    kind = TYPE_ALIASES.get(str(item.get("type") or "").strip().lower())
+    if kind is None:
+        raise ValueError(f"invalid type '{item.get('type')}'")
+    amount = item.get("amount")
+    try:
+        if isinstance(amount, bool):
+            raise ValueError
+        amount = float(str(amount).replace(",", "").replace("₹", "").strip()) if isinstance(amount, str) else float(amount)
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid amount '{amount}'")
+    if not math.isfinite(amount):
+        raise ValueError(f"invalid amount '{amount}'")
+    category = str(item.get("category") or "").strip() or DEFAULT_CATEGORY
+    date = item.get("date")
+    ts = None if date in (None, "") else parse_statement_date(date)
+    return category, amount, TYPE_NAMES[kind], ts
+
+
+def apply_to_ledger(ledger, posts):
+    # Applies posts [(transactions, force)] in arrival order; consecutive posts with the same force
+    # flag go to the ledger as one batch. Returns the per-row results of each post.
+    results = []
+    i = 0
+    while i < len(posts):
+        force = posts[i][1]
+        j = i
+        while j < len(posts) and posts[j][1] == force:
+            j += 1
+        batch = ledger.add_many([t for transactions, _ in posts[i:j] for t in transactions], force)
+        for transactions, _ in posts[i:j]:
+            results.append(batch[:len(transactions)])
+            batch = batch[len(transactions):]
+        i = j
+    return results
+
+
+class IngestServer:
+    # Local HTTP endpoint for other tools to post transactions: POST /transactions with one
+    # transaction object, a list of them or {"transactions": [...], "force": true}. GET /health
+    # reports the queue depth. Requests are parsed on an asyncio loop and queued; the thread that
+    # owns the ledger calls drain(), which hands everything queued since the last call to
+    # apply(posts) as one batch and answers each request with its per-row results.
+    # Bound to localhost (or a Unix socket) only; a token, when set, must come as a Bearer header.
+    # Over TCP, requests from web pages are refused: any request with an Origin header, which
+    # browsers send on cross-site POSTs (CSRF), and any whose Host is not a loopback name, which
+    # is what a page on a rebound DNS name would send.
+    # When run() applies posts itself, it waits batch_delay seconds after the first queued post so
+    # posts arriving meanwhile share one batch and one journal fsync.
+    def __init__(self, apply, host="127.0.0.1", port=8765, path=None, token=None, max_pending=100000, batch_delay=0.005):
+        if not path and not is_loopback(host):
+            raise ValueError(f"refusing to listen on {host}: only loopback addresses are allowed")
+        self.apply = apply
+        self.host = host
+        self.port = port
+        self.path = path
+        self.token = token
+        self.max_pending = max_pending
+        self.batch_delay = batch_delay
+        self.queue = []
+        self.queued_rows = 0
+        self.lock = threading.Lock()
+        self.inline = False
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+
+    @property
+    def address(self):
+        if self.server is None:
+            return None
+        return self.server.sockets[0].getsockname()
+
+    def start(self):
+        # Serves from a background thread; the owner must call drain() regularly
+        self.thread = threading.Thread(target=self._serve, name="wallet-ingest", daemon=True)
+        self.thread.start()
+        self.ready.wait(10)
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        # Serves on this thread and applies posts as they arrive, until interrupted
+        self.inline = True
+        self._serve()
+        if self.error is not None:
+            raise self.error
+
+    def stop(self):
+        # Posts still queued are dropped unanswered, so their clients see them fail
+        if self.thread is not None and self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(10)
+        self.thread = None
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            if self.path:
+                self.server = self.loop.run_until_complete(asyncio.start_unix_server(self._handle, self.path))
+            else:
+                self.server = self.loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            self.error = e
+            self.loop.close()
+            self.ready.set()
+            return
+        log.info("Accepting transactions on %s", self.address)
+        self.ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            self.server.close()
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.wait(tasks))
+            self.loop.close()
+
+    def drain(self):
+        # Applies every queued post as one batch on the calling thread; returns how many posts
+        with self.lock:
+            posts, self.queue = self.queue, []
+            self.queued_rows = 0
+        if not posts:
+            return 0
+        try:
+            results = self.apply([(transactions, force) for transactions, force, _ in posts])
+        except Exception as e:
+            log.error("Applying posted transactions failed: %r", e)
+            results = [e] * len(posts)
+        metrics.count("ingest_batches")
+        futures = [future for _, _, future in posts]
+        if self.inline:
+            self._resolve(futures, results)
+            return len(posts)
+        try:
+            # One wakeup of the loop answers the whole batch
+            self.loop.call_soon_threadsafe(self._resolve, futures, results)
+        except RuntimeError:
+            # The loop has stopped; the client connections are gone with it
+            pass
+        return len(posts)
+
+    @staticmethod
+    def _resolve(futures, results):
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, target, keep_alive, headers, body = request
+                    status, payload = await self._dispatch(method, target, headers, body)
+                except BadRequest as e:
+                    status, payload, keep_alive = e.status, {"error": str(e)}, False
+                self._write(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # stop() cancels connections still open. The task ends normally instead of re-raising,
+            # since start_server's done callback logs a traceback for every cancelled handler.
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        # The request line and headers come in one read; None when the client has gone
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if not e.partial.strip():
+                return None
+            raise BadRequest(400, "incomplete request")
+        except asyncio.LimitOverrunError:
+            raise BadRequest(413, "headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split()
+        except ValueError:
+            raise BadRequest(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise BadRequest(400, "invalid Content-Length")
+        if length > MAX_BODY:
+            raise BadRequest(413, f"body larger than {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+        return method, target.split("?")[0], keep_alive, headers, body
+
+    async def _dispatch(self, method, target, headers, body):
+        if not self.path:
+            if "origin" in headers:
+                return 403, {"error": "requests from web pages are not accepted"}
+            if not local_host_header(headers.get("host", "")):
+                return 403, {"error": "Host must be localhost"}
+        if self.token and headers.get("authorization") != f"Bearer {self.token}":
+            return 401, {"error": "missing or wrong token"}
+        if target == "/health":
+            if method != "GET":
+                return 405, {"error": "use GET"}
+            return 200, {"status": "ok", "queued": self.queued_rows}
+        if target != "/transactions":
+            return 404, {"error": f"no such endpoint {target}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        return await self._post(body)
+
+    async def _post(self, body):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return 400, {"error": "invalid JSON"}
+        force = False
+        if isinstance(payload, dict) and "transactions" in payload:
+            force = bool(payload.get("force", False))
+            payload = payload["transactions"]
+        items = payload if isinstance(payload, list) else [payload]
+        transactions = []
+        errors = []
+        for item in items:
+            try:
+                transactions.append(parse_transaction(item))
+                errors.append(None)
+            except ValueError as e:
+                errors.append(str(e))
+        applied = []
+        if transactions:
+            future = self.loop.create_future()
+            with self.lock:
+                if self.queued_rows + len(transactions) > self.max_pending:
+                    return 503, {"error": "too many transactions waiting; retry shortly"}
+                self.queue.append((transactions, force, future))
+                self.queued_rows += len(transactions)
+                first = len(self.queue) == 1
+            metrics.count("ingest_posts")
+            if self.inline and first:
+                # Everything posted before this callback runs joins the same batch
+                self.loop.call_later(self.batch_delay, self.drain)
+            try:
+                applied = iter(await future)
+            except Exception as e:
+                return 500, {"error": f"could not apply the transactions: {e}"}
+        results = []
+        for error in errors:
+            if error is None:
+                index, error = next(applied)
+                if error is None:
+                    results.append({"index": index})
+                    continue
+            results.append({"error": error})
+        accepted = sum("index" in r for r in results)
+        return 200, {"accepted": accepted, "rejected": len(results) - accepted, "results": results}
+
+    def _write(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                     .encode() + body)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=10):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class IngestClient:
+    # Keep-alive client for scripts and tests; post() returns the decoded response
+    def __init__(self, host="127.0.0.1", port=8765, path=None, token=None, timeout=10):
+        if path:
+            self.conn = UnixHTTPConnection(path, timeout)
+        else:
+            self.conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def _request(self, method, target, body=None):
+        self.conn.request(method, target, body, self.headers)
+        response = self.conn.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise ValueError(f"{response.status} {data.get('error', '')}")
+        return data
+
+    def post(self, transactions, force=False):
+        # transactions: one transaction dict or a list of them
+        if isinstance(transactions, dict):
+            transactions = [transactions]
+        return self._request("POST", "/transactions", json.dumps({"transactions": transactions, "force": force}))
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,179 @@
+import cProfile
+import functools
+import io
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+
+# Hot-path instrumentation: named latency histograms, counters and an on-demand cProfile and
+# tracemalloc capture, plus the "wallet" logger that replaces the old debug prints.
+#
+#   WALLET_LOG_LEVEL=DEBUG   log level for the "wallet" logger (default WARNING)
+#   WALLET_METRICS=1         collect timings and counters from startup
+#   WALLET_PROFILE=1         profile from startup and dump the profile on exit
+
+log = logging.getLogger("wallet")
+
+BUCKETS = 32
+
+
+class Histogram:
+    # Latency histogram with power-of-two microsecond buckets, plus count, total, min and max
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th percentile, in seconds
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min((1 << i) / 1e6, self.max)
+        return self.max
+
+    def summary(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 4),
+            "min_ms": round(self.min * 1000, 4),
+            "p50_ms": round(self.percentile(0.5) * 1000, 4),
+            "p95_ms": round(self.percentile(0.95) * 1000, 4),
+            "p99_ms": round(self.percentile(0.99) * 1000, 4),
+            "max_ms": round(self.max * 1000, 4)
+        }
+
+
+class Instrumentation:
+    # Everything is gated on `enabled`, so a disabled hot path pays one attribute check per call.
+    # Timings recorded from the worker thread use their own names (render_chart), so the
+    # histograms are never updated from two threads at once.
+    def __init__(self):
+        self.enabled = False
+        self.timings = {}
+        self.counters = {}
+        self.profiler = None
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        log.info("Instrumentation %s", "enabled" if enabled else "disabled")
+
+    def reset(self):
+        self.timings = {}
+        self.counters = {}
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.add(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        return {
+            "timings": {name: histogram.summary() for name, histogram in sorted(self.timings.items())},
+            "counters": dict(sorted(self.counters.items()))
+        }
+
+    def report(self):
+        lines = [f"{'operation':<24}{'count':>8}{'mean ms':>10}{'p95 ms':>10}{'max ms':>10}"]
+        for name, summary in self.snapshot()["timings"].items():
+            if summary["count"]:
+                lines.append(f"{name:<24}{summary['count']:>8}{summary['mean_ms']:>10.3f}"
+                             f"{summary['p95_ms']:>10.3f}{summary['max_ms']:>10.3f}")
+        for name, value in self.snapshot()["counters"].items():
+            lines.append(f"{name:<24}{value:>8}")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(dict(self.snapshot(), time=time.strftime("%Y-%m-%dT%H:%M:%S")), f, indent=2)
+        log.info("Metrics written to %s", path)
+        return path
+
+    @property
+    def profiling(self):
+        return self.profiler is not None
+
+    def start_profile(self):
+        # cProfile only sees the thread that starts it (the Tk thread); tracemalloc sees all threads
+        if self.profiler is not None:
+            return
+        self.profiler = cProfile.Profile()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.profiler.enable()
+        log.info("Profiling started")
+
+    def stop_profile(self, path_prefix):
+        # Writes <prefix>.prof (pstats) and <prefix>.txt (top functions and allocation sites)
+        if self.profiler is None:
+            return None
+        self.profiler.disable()
+        self.profiler.dump_stats(path_prefix + ".prof")
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats("cumulative").print_stats(40)
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        text.write("\nTop allocation sites\n")
+        for stat in snapshot.statistics("lineno")[:25]:
+            text.write(f"{stat}\n")
+        with open(path_prefix + ".txt", "w") as f:
+            f.write(text.getvalue())
+        self.profiler = None
+        log.info("Profile written to %s.prof and %s.txt", path_prefix, path_prefix)
+        return path_prefix + ".txt"
+
+
+metrics = Instrumentation()
+
+
+def timed(name):
+    # Decorator recording each call's duration under `name` when instrumentation is enabled
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not metrics.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+def configure(settings=None):
+    # Environment variables win over the Settings toggle
+    settings = settings or {}
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    log.setLevel(os.environ.get("WALLET_LOG_LEVEL", "WARNING").upper())
+    metrics.enable(os.environ.get("WALLET_METRICS", "") == "1" or settings.get("instrumentation", False))
+    if os.environ.get("WALLET_PROFILE", "") == "1":
+        metrics.start_profile()
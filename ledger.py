@@ -0,0 +1,433 @@
+import calendar
+import time
+import numpy as np
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+CREDIT = 0
+DEBIT = 1
+TYPE_NAMES = ("Credit", "Debit")
+TYPE_CODES = {"Credit": CREDIT, "Debit": DEBIT}
+# Largest single amount in rupees; keeps paise, and totals of many rows, well inside int64
+MAX_AMOUNT = 10 ** 12
+
+# Timestamps are wall-clock seconds: the local date/time the user sees, encoded as if it were UTC.
+# That keeps day/month bucketing a matter of integer division and datetime64 casts.
+
+
+def to_paise(amount):
+    return int(round(float(amount) * 100))
+
+
+def to_rupees(paise):
+    return paise / 100
+
+
+def timestamp_from_datetime(dt):
+    return calendar.timegm(dt.timetuple())
+
+
+def current_timestamp():
+    return calendar.timegm(time.localtime())
+
+
+def parse_date(date):
+    return calendar.timegm(time.strptime(date, DATE_FORMAT))
+
+
+def format_timestamp(ts):
+    return time.strftime(DATE_FORMAT, time.gmtime(ts))
+
+
+def day_key(ts):
+    return int(ts) // 86400
+
+
+def month_key(ts):
+    tm = time.gmtime(ts)
+    return (tm.tm_year - 1970) * 12 + tm.tm_mon - 1
+
+
+def day_bounds(ts):
+    start = day_key(ts) * 86400
+    return start, start + 86400
+
+
+def month_bounds(ts):
+    tm = time.gmtime(ts)
+    year, month = (tm.tm_year + 1, 1) if tm.tm_mon == 12 else (tm.tm_year, tm.tm_mon + 1)
+    return calendar.timegm((tm.tm_year, tm.tm_mon, 1, 0, 0, 0)), calendar.timegm((year, month, 1, 0, 0, 0))
+
+
+class TransactionStore:
+    # Columnar transaction ledger: one NumPy buffer per field, grown geometrically.
+    # A row costs 21 bytes (int64 timestamp, int64 paise, uint8 type, int32 category code)
+    # instead of a dict of four boxed objects.
+    def __init__(self, capacity=1024):
+        self._ts = np.empty(capacity, dtype=np.int64)
+        self._amount = np.empty(capacity, dtype=np.int64)
+        self._kind = np.empty(capacity, dtype=np.uint8)
+        self._category = np.empty(capacity, dtype=np.int32)
+        self.size = 0
+        self.balance_paise = 0
+        self.categories = []
+        self._category_codes = {}
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._ts)
+
+    @property
+    def nbytes(self):
+        return self._ts.nbytes + self._amount.nbytes + self._kind.nbytes + self._category.nbytes
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= self.capacity:
+            return
+        capacity = max(needed, self.capacity * 2)
+        for name in ("_ts", "_amount", "_kind", "_category"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def category_code(self, category):
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def find_category(self, category):
+        return self._category_codes.get(category)
+
+    def append(self, ts, kind, category, paise):
+        self._reserve(1)
+        i = self.size
+        self._ts[i] = ts
+        self._amount[i] = paise
+        self._kind[i] = kind
+        self._category[i] = self.category_code(category)
+        self.size = i + 1
+        self.balance_paise += paise if kind == CREDIT else -paise
+        return i
+
+    def extend(self, timestamps, kinds, category_codes, paise):
+        n = len(timestamps)
+        self._reserve(n)
+        end = self.size + n
+        self._ts[self.size:end] = timestamps
+        self._amount[self.size:end] = paise
+        self._kind[self.size:end] = kinds
+        self._category[self.size:end] = category_codes
+        self.size = end
+        # Only the new rows, so a small batch on a large ledger stays cheap
+        kinds = self._kind[end - n:end]
+        amounts = self._amount[end - n:end]
+        self.balance_paise += int(amounts[kinds == CREDIT].sum() - amounts[kinds != CREDIT].sum())
+
+    def append_record(self, record):
+        return self.append(parse_date(record["date"]), TYPE_CODES[record["type"]], record["category"], to_paise(record["amount"]))
+
+    @classmethod
+    def from_columns(cls, timestamps, kinds, category_codes, paise, categories):
+        store = cls(max(len(timestamps), 1024))
+        for category in categories:
+            store.category_code(category)
+        store.extend(timestamps, kinds, category_codes, paise)
+        return store
+
+    @classmethod
+    def from_views(cls, timestamps, kinds, category_codes, paise, categories):
+        # Wraps existing arrays, e.g. fields of a memory-mapped ledger file, without copying them.
+        # The first append copies the columns into buffers the store owns.
+        store = cls(0)
+        store._ts, store._kind, store._category, store._amount = timestamps, kinds, category_codes, paise
+        store.size = len(timestamps)
+        for category in categories:
+            store.category_code(category)
+        store.balance_paise = int(store.signed_amounts().sum())
+        return store
+
+    @classmethod
+    def from_records(cls, records):
+        store = cls(max(len(records), 1))
+        n = len(records)
+        store.extend(
+            np.fromiter((parse_date(r["date"]) for r in records), dtype=np.int64, count=n),
+            np.fromiter((TYPE_CODES[r["type"]] for r in records), dtype=np.uint8, count=n),
+            np.fromiter((store.category_code(r["category"]) for r in records), dtype=np.int32, count=n),
+            np.fromiter((to_paise(r["amount"]) for r in records), dtype=np.int64, count=n),
+        )
+        return store
+
+    # Zero-copy views over the filled part of each column.
+    @property
+    def timestamps(self):
+        return self._ts[:self.size]
+
+    @property
+    def amounts(self):
+        return self._amount[:self.size]
+
+    @property
+    def kinds(self):
+        return self._kind[:self.size]
+
+    @property
+    def category_codes(self):
+        return self._category[:self.size]
+
+    def signed_amounts(self):
+        return np.where(self.kinds == CREDIT, self.amounts, -self.amounts)
+
+    def cumulative_credits(self):
+        return np.cumsum(np.where(self.kinds == CREDIT, self.amounts, 0))
+
+    def cumulative_debits(self):
+        return np.cumsum(np.where(self.kinds == DEBIT, self.amounts, 0))
+
+    def net_balance(self):
+        return np.cumsum(self.signed_amounts())
+
+    def balance(self):
+        return to_rupees(self.balance_paise)
+
+    def row(self, i):
+        # Display tuple for the history Treeview
+        return (format_timestamp(self._ts[i]), TYPE_NAMES[self._kind[i]], self.categories[self._category[i]], f"₹{to_rupees(int(self._amount[i]))}")
+
+    def record(self, i):
+        return {
+            "type": TYPE_NAMES[self._kind[i]],
+            "category": self.categories[self._category[i]],
+            "amount": to_rupees(int(self._amount[i])),
+            "date": format_timestamp(self._ts[i])
+        }
+
+    def records(self, count=None):
+        # count pins the rows to read, so a reader on another thread ignores rows appended meanwhile
+        for i in range(self.size if count is None else count):
+            yield self.record(i)
+
+
+def group_totals(keys, credits, debits):
+    # Group-by-sum: (unique keys, credit sums, debit sums)
+    low = int(keys.min())
+    span = int(keys.max()) - low + 1
+    if span <= 4 * len(keys) + 1024:
+        # Dense keys (days, months and category codes usually are): bin by offset, no sort
+        offsets = keys - low
+        unique = np.flatnonzero(np.bincount(offsets, minlength=span))
+        return (unique + low, np.bincount(offsets, weights=credits, minlength=span)[unique],
+                np.bincount(offsets, weights=debits, minlength=span)[unique])
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return (unique, np.bincount(inverse, weights=credits, minlength=len(unique)),
+            np.bincount(inverse, weights=debits, minlength=len(unique)))
+
+
+class SpendIndex:
+    # Running credit/debit totals in paise per day, month and category code.
+    # Each bucket is a [credit, debit] pair so a new transaction is folded in with O(1) work.
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.by_day = {}
+        self.by_month = {}
+        self.by_category = {}
+        self.totals = [0, 0]
+
+    def add(self, kind, category_code, paise, ts):
+        for buckets, key in ((self.by_day, day_key(ts)), (self.by_month, month_key(ts)), (self.by_category, category_code)):
+            totals = buckets.get(key)
+            if totals is None:
+                totals = buckets[key] = [0, 0]
+            totals[kind] += paise
+        self.totals[kind] += paise
+
+    def rebuild(self, store):
+        self.reset()
+        self.add_batch(store, 0)
+
+    def add_batch(self, store, start):
+        # Fold rows [start, len(store)) in with one vectorized group-by per bucket kind
+        # instead of replaying add() per row. Months are rolled up from the day totals.
+        if start >= len(store):
+            return
+        kinds = store.kinds[start:]
+        amounts = store.amounts[start:]
+        credits = np.where(kinds == CREDIT, amounts, 0)
+        debits = np.where(kinds == DEBIT, amounts, 0)
+        days, day_credit, day_debit = group_totals(store.timestamps[start:] // 86400, credits, debits)
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        for buckets, (keys, credit, debit) in ((self.by_day, (days, day_credit, day_debit)),
+                                               (self.by_month, group_totals(months, day_credit, day_debit)),
+                                               (self.by_category, group_totals(store.category_codes[start:], credits, debits))):
+            for key, c, d in zip(keys.tolist(), credit.tolist(), debit.tolist()):
+                totals = buckets.get(key)
+                if totals is None:
+                    buckets[key] = [int(c), int(d)]
+                else:
+                    totals[CREDIT] += int(c)
+                    totals[DEBIT] += int(d)
+        self.totals[CREDIT] += int(credits.sum())
+        self.totals[DEBIT] += int(debits.sum())
+
+    def daily_debit(self, ts):
+        return to_rupees(self.by_day.get(day_key(ts), (0, 0))[DEBIT])
+
+    def monthly_debit(self, ts):
+        return to_rupees(self.by_month.get(month_key(ts), (0, 0))[DEBIT])
+
+    def category_totals(self, category_code):
+        credit, debit = self.by_category.get(category_code, (0, 0))
+        return to_rupees(credit), to_rupees(debit)
+
+    def balance(self):
+        return to_rupees(self.totals[CREDIT] - self.totals[DEBIT])
+
+
+class BalanceIndex:
+    # Transactions sorted by timestamp with prefix sums of credits and debits, so the balance at
+    # any moment and the flow over any date range are a binary search and two lookups.
+    # Appends that arrive in time order (the usual case) are folded in at the end; an older row,
+    # e.g. from a back-dated import, triggers one vectorized rebuild.
+    def __init__(self):
+        self.count = 0
+        self.size = 0
+        self._times = np.empty(1024, dtype=np.int64)
+        self._credit = np.zeros(1025, dtype=np.int64)
+        self._debit = np.zeros(1025, dtype=np.int64)
+
+    @property
+    def times(self):
+        return self._times[:self.size]
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self._times):
+            return
+        capacity = max(needed, len(self._times) * 2)
+        for name, length in (("_times", capacity), ("_credit", capacity + 1), ("_debit", capacity + 1)):
+            old = getattr(self, name)
+            new = np.empty(length, dtype=np.int64)
+            new[:self.size + (name != "_times")] = old[:self.size + (name != "_times")]
+            setattr(self, name, new)
+
+    def _append(self, ts, kinds, amounts):
+        order = np.argsort(ts, kind="stable")
+        ts, kinds, amounts = ts[order], kinds[order], amounts[order]
+        self._reserve(len(ts))
+        start, end = self.size, self.size + len(ts)
+        self._times[start:end] = ts
+        self._credit[start + 1:end + 1] = self._credit[start] + np.cumsum(np.where(kinds == CREDIT, amounts, 0))
+        self._debit[start + 1:end + 1] = self._debit[start] + np.cumsum(np.where(kinds == DEBIT, amounts, 0))
+        self.size = end
+
+    def update(self, store):
+        n = len(store)
+        if n == self.count:
+            return
+        start = self.count
+        if n < start or (self.size and int(store.timestamps[start:n].min()) < int(self._times[self.size - 1])):
+            start = self.size = 0
+        self._append(store.timestamps[start:n], store.kinds[start:n], store.amounts[start:n])
+        self.count = n
+
+    def position(self, ts):
+        # Number of transactions at or before ts
+        return int(np.searchsorted(self.times, ts, side="right"))
+
+    def balance_at(self, ts):
+        # Balance in paise after every transaction up to and including ts
+        i = self.position(ts)
+        return int(self._credit[i] - self._debit[i])
+
+    def flow_between(self, start, end):
+        # (credit, debit) in paise for transactions with start <= ts < end
+        lo, hi = np.searchsorted(self.times, (start, end), side="left")
+        return int(self._credit[hi] - self._credit[lo]), int(self._debit[hi] - self._debit[lo])
+
+    def samples(self, start=None, end=None, max_points=2000):
+        # (times, cumulative credit, cumulative debit, balance) in paise over [start, end]: every
+        # transaction when few enough fall in the range, otherwise max_points evenly spaced
+        # moments. Costs O(points log n) however long the history is.
+        times = self.times
+        if not self.size:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, empty, empty
+        start = int(times[0]) if start is None else int(start)
+        end = int(times[-1]) if end is None else int(end)
+        lo, hi = np.searchsorted(times, (start, end), side="right")
+        if hi - lo <= max_points:
+            at = np.concatenate(([start], times[lo:hi], [end]))
+            idx = np.concatenate(([lo], np.arange(lo + 1, hi + 1), [hi]))
+        else:
+            at = np.linspace(start, end, max_points).astype(np.int64)
+            idx = np.searchsorted(times, at, side="right")
+        credit = self._credit[idx]
+        debit = self._debit[idx]
+        return at, credit, debit, credit - debit
+
+
+class HistoryQuery:
+    # Filtered and sorted row order over the columnar store, built with vectorized masks.
+    # With no filter or sort the order is the ledger itself and nothing is materialized.
+    def __init__(self, store):
+        self.store = store
+        self.kind = None
+        self.category = None
+        self.start = None
+        self.end = None
+        self.sort_column = None
+        self.descending = False
+        self.order = None
+
+    def is_identity(self):
+        return (self.kind is None and self.category is None and self.start is None
+                and self.end is None and self.sort_column is None)
+
+    def refresh(self):
+        if self.is_identity():
+            self.order = None
+            return
+        store = self.store
+        mask = np.ones(len(store), dtype=bool)
+        if self.kind is not None:
+            mask &= store.kinds == self.kind
+        if self.category is not None:
+            mask &= store.category_codes == self.category
+        if self.start is not None:
+            mask &= store.timestamps >= self.start
+        if self.end is not None:
+            mask &= store.timestamps < self.end
+        order = np.flatnonzero(mask)
+        if self.sort_column is not None:
+            order = order[np.argsort(self._sort_key()[order], kind="stable")]
+        if self.descending:
+            order = order[::-1]
+        self.order = order
+
+    def _sort_key(self):
+        store = self.store
+        if self.sort_column == "Type":
+            return store.kinds
+        if self.sort_column == "Category":
+            ranks = np.empty(len(store.categories), dtype=np.int32)
+            ranks[np.argsort(np.array(store.categories, dtype=str))] = np.arange(len(store.categories))
+            return ranks[store.category_codes]
+        if self.sort_column == "Amount":
+            return store.amounts
+        return store.timestamps
+
+    def __len__(self):
+        return len(self.store) if self.order is None else len(self.order)
+
+    def rows(self, start, end):
+        if self.order is None:
+            return [self.store.row(i) for i in range(start, end)]
+        return [self.store.row(i) for i in self.order[start:end]]
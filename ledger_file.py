@@ -0,0 +1,151 @@
+import mmap
+import os
+import struct
+import numpy as np
+from ledger import TransactionStore
+
+# Binary ledger file: a 64-byte header, fixed-width little-endian records, then the category
+# string table. Records keep the category as an id into that table.
+#
+#   header    magic, version, header size, record size, record count, table offset, table size
+#   records   ts int64 (wall-clock seconds), paise int64, category int32, type uint8, 3 pad bytes
+#   table     uint32 count, then per category a uint16 byte length and its UTF-8 bytes
+
+MAGIC = b"WALLETLG"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQQQ")
+HEADER_SIZE = 64
+RECORD_DTYPE = np.dtype([("ts", "<i8"), ("paise", "<i8"), ("category", "<i4"), ("type", "u1"), ("pad", "V3")])
+
+
+def _encode_table(categories):
+    parts = [struct.pack("<I", len(categories))]
+    for category in categories:
+        data = category.encode("utf-8")
+        parts.append(struct.pack("<H", len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def _decode_table(data):
+    count, = struct.unpack_from("<I", data)
+    pos = 4
+    categories = []
+    for _ in range(count):
+        length, = struct.unpack_from("<H", data, pos)
+        pos += 2
+        categories.append(bytes(data[pos:pos + length]).decode("utf-8"))
+        pos += length
+    return categories
+
+
+class LedgerFileWriter:
+    # Streams records into a temporary file in chunks; close() writes the category table, fills
+    # in the header and moves the file into place, so readers never see a half-written ledger.
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.count = 0
+        self._file = open(self.tmp_path, "wb")
+        self._file.write(bytes(HEADER_SIZE))
+
+    def write(self, timestamps, kinds, category_codes, paise):
+        records = np.zeros(len(timestamps), dtype=RECORD_DTYPE)
+        records["ts"] = timestamps
+        records["paise"] = paise
+        records["category"] = category_codes
+        records["type"] = kinds
+        self._file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self, categories):
+        table = _encode_table(categories)
+        offset = HEADER_SIZE + self.count * RECORD_DTYPE.itemsize
+        self._file.write(table)
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, HEADER_SIZE, RECORD_DTYPE.itemsize, self.count, offset, len(table)))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self.tmp_path)
+
+
+def write_ledger_file(path, store, chunk_size=1 << 20):
+    writer = LedgerFileWriter(path)
+    try:
+        for start in range(0, len(store), chunk_size):
+            end = start + chunk_size
+            writer.write(store.timestamps[start:end], store.kinds[start:end],
+                         store.category_codes[start:end], store.amounts[start:end])
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close(store.categories)
+
+
+class LedgerFile:
+    # Read side: the file is mapped read-only and the records are a structured NumPy view over the
+    # mapping, so opening reads the header and category table and nothing else. Pages are only
+    # touched when a column is actually used.
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < HEADER_SIZE:
+            raise ValueError(f"{path} is not a wallet ledger file")
+        magic, version, header_size, record_size, count, offset, table_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a wallet ledger file")
+        if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path} has unsupported ledger format version {version}")
+        if offset + table_size > len(self._map) or header_size + count * record_size > offset:
+            raise ValueError(f"{path} is truncated")
+        self.records = np.frombuffer(self._map, dtype=RECORD_DTYPE, count=count, offset=header_size)
+        self.categories = _decode_table(memoryview(self._map)[offset:offset + table_size])
+
+    def __len__(self):
+        return len(self.records)
+
+    def store(self):
+        # Zero-copy: the store's columns are strided views of the mapped records until its first append
+        return TransactionStore.from_views(self.records["ts"], self.records["type"], self.records["category"],
+                                           self.records["paise"], self.categories)
+
+    def close(self):
+        # The mapping stays open while any view of it is alive; it is released with the last view then
+        self.records = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+
+
+def json_to_ledger_file(json_path, path, chunk_size=100000):
+    # Streams an exported JSON history (or any statement the importer reads) into a ledger file.
+    # Returns (written, rejected).
+    from importer import StatementImporter
+    importer = StatementImporter(json_path, chunk_size=chunk_size)
+    store = TransactionStore()
+    writer = LedgerFileWriter(path)
+    try:
+        for timestamps, kinds, codes, paise in importer.chunks(store):
+            writer.write(timestamps, kinds, codes, paise)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close(store.categories)
+    return writer.count, importer.rejected
+
+
+def ledger_file_to_json(path, json_path, chunk_size=100000):
+    # Streams the ledger out in the export_data layout, or JSON Lines / CSV / gzip by extension
+    from exporter import StatementExporter
+    ledger = LedgerFile(path)
+    try:
+        return StatementExporter(ledger.store(), json_path, chunk_size=chunk_size).export()
+    finally:
+        ledger.close()
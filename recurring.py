@@ -0,0 +1,130 @@
+import heapq
+import numpy as np
+from ledger import TYPE_CODES, current_timestamp, format_timestamp, month_key, parse_date
+from instrument import log, timed
+
+
+def occurrence_times(first_month, last_month, day, every=1, time_of_day=0):
+    # Timestamps of day `day` (clamped to the month's length) of every `every`-th month from
+    # first_month through last_month, as an int64 array. Months are counted as in month_key().
+    months = np.arange(first_month, last_month + 1, every)
+    starts = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64)
+    lengths = (months + 1).astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) - starts
+    return (starts + np.minimum(day, lengths) - 1) * 86400 + time_of_day
+
+
+def first_occurrence_after(ts, day, every=1):
+    # First occurrence on a later date than ts, so a schedule set up on its due day starts next time
+    month = month_key(ts)
+    times = occurrence_times(month, month + every, day, every)
+    return int(times[times >= (ts // 86400 + 1) * 86400][0])
+
+
+class RecurringSchedule:
+    # Recurring credits and debits for regular categories (salary, rent, subscriptions), kept in
+    # recurring.json as {category: {"type", "day", "every", "next"}}: monthly on `day`, every
+    # `every` months. Amounts come from regular_categories when an occurrence is posted. `next` is
+    # the first occurrence not yet posted, so whatever fell due while the wallet was closed is
+    # posted on the next start, all of it as one batch.
+    def __init__(self, ledger):
+        self.ledger = ledger
+
+    @property
+    def entries(self):
+        return self.ledger.recurring
+
+    def set(self, category, transaction_type, day, every=1, now=None):
+        if transaction_type not in TYPE_CODES:
+            raise ValueError("Please select either Credit or Debit")
+        if not 1 <= day <= 31:
+            raise ValueError("Day must be between 1 and 31")
+        if every < 1:
+            raise ValueError("Repeat interval must be at least one month")
+        now = current_timestamp() if now is None else now
+        entries = dict(self.entries)
+        entries[category] = {"type": transaction_type, "day": day, "every": every,
+                             "next": format_timestamp(first_occurrence_after(now, day, every))}
+        self.ledger.set_recurring(entries)
+
+    def remove(self, category):
+        if category in self.entries:
+            self.ledger.set_recurring({c: e for c, e in self.entries.items() if c != category})
+
+    def next_due(self):
+        # [(timestamp, category)] of each schedule's next occurrence
+        return [(parse_date(entry["next"]), category) for category, entry in self.entries.items()]
+
+    def take(self, categories=None, now=None):
+        # Rows (category, amount, type, ts) for every occurrence due by now, in time order with
+        # credits first, and moves each schedule's `next` past them. Not saved until apply().
+        now = current_timestamp() if now is None else now
+        rows = []
+        for category in self.entries if categories is None else categories:
+            entry = self.entries.get(category)
+            if entry is None:
+                continue
+            first = parse_date(entry["next"])
+            if first > now:
+                continue
+            times = occurrence_times(month_key(first), month_key(now) + entry["every"], entry["day"], entry["every"],
+                                     first % 86400)
+            due = times[(times >= first) & (times <= now)]
+            entry["next"] = format_timestamp(int(times[times > now][0]))
+            amount = self.ledger.regular_categories.get(category, 0)
+            if amount <= 0:
+                log.info("Skipping %d occurrences of %s: no amount set", len(due), category)
+                continue
+            rows.extend((category, amount, entry["type"], ts) for ts in due.tolist())
+        rows.sort(key=lambda row: (row[3], TYPE_CODES[row[2]]))
+        return rows
+
+    @timed("recurring_apply")
+    def apply(self, categories=None, now=None):
+        # Posts everything due in one ledger batch and saves the schedules. Scheduled rows are
+        # pre-approved, so limit warnings do not stop them; balance and monthly limit rules do.
+        # Returns [(row, reason or None)].
+        rows = self.take(categories, now)
+        results = self.ledger.add_many(rows, force=True) if rows else []
+        self.ledger.set_recurring(self.entries)
+        return [(row, error) for row, (_, error) in zip(rows, results)]
+
+
+class TimerQueue:
+    # Heap of (due timestamp, key) behind a single root.after callback armed for the earliest
+    # entry. When it fires, every key that is due is handed to fire(keys, now) at once. Due times
+    # are wall-clock, so the wait is capped at max_delay_ms and re-checked after clock changes or sleep.
+    def __init__(self, root, fire, max_delay_ms=3600000):
+        self.root = root
+        self.fire = fire
+        self.max_delay_ms = max_delay_ms
+        self.heap = []
+        self.job = None
+
+    def push(self, due, key):
+        heapq.heappush(self.heap, (due, key))
+        self._arm()
+
+    def clear(self):
+        self.heap = []
+        self.cancel()
+
+    def cancel(self):
+        if self.job is not None:
+            self.root.after_cancel(self.job)
+            self.job = None
+
+    def _arm(self):
+        self.cancel()
+        if self.heap:
+            delay = min(max((self.heap[0][0] - current_timestamp()) * 1000, 0), self.max_delay_ms)
+            self.job = self.root.after(int(delay), self._run)
+
+    def _run(self):
+        self.job = None
+        now = current_timestamp()
+        keys = []
+        while self.heap and self.heap[0][0] <= now:
+            keys.append(heapq.heappop(self.heap)[1])
+        if keys:
+            self.fire(keys, now)
+        self._arm()
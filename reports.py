@@ -0,0 +1,223 @@
+import numpy as np
+from ledger import BalanceIndex, DEBIT, current_timestamp, day_key, month_key, month_bounds
+
+MONTH_NAMES = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def month_label(month):
+    # month is months since 1970-01, as returned by month_key()
+    return f"{MONTH_NAMES[month % 12]} {1970 + month // 12}"
+
+
+def _regrid(values, first, new_first, new_size):
+    # Copy values (last axis indexed from first) into a zeroed array indexed from new_first
+    grown = np.zeros(values.shape[:-1] + (new_size,), dtype=values.dtype)
+    offset = first - new_first
+    grown[..., offset:offset + values.shape[-1]] = values
+    return grown
+
+
+class ReportEngine:
+    # Dense credit/debit rollups per day and per (category, month), kept in paise and folded
+    # forward as rows are appended; nothing is recomputed for rows already seen. Large batches are
+    # folded with one bincount over the whole grid, small ones (a row added in the GUI) with
+    # np.add.at on just the cells they touch, so an append does not cost the size of the grid.
+    # Reports derived from the rollups are memoized and the memo is dropped when new rows arrive,
+    # so asking for the same report twice between appends is a dictionary lookup. The balance
+    # index behind the Trends tab is only brought up to date when a balance or range is asked for.
+    # Batches with fewer rows than grid cells / DENSE_RATIO are added cell by cell
+    DENSE_RATIO = 8
+
+    def __init__(self, store):
+        self.store = store
+        self.cache = {}
+        self.balance_index = BalanceIndex()
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.first_day = 0
+        self.by_day = np.zeros((2, 0), dtype=np.int64)
+        self.first_month = 0
+        self.by_category_month = np.zeros((2, 0, 0), dtype=np.int64)
+        self.cache.clear()
+
+    def restore(self, count, first_day, by_day, first_month, by_category_month):
+        # Starts from saved rollups (see rollups.py) covering the first `count` rows
+        self.count = count
+        self.first_day = first_day
+        self.by_day = by_day
+        self.first_month = first_month
+        self.by_category_month = by_category_month
+        self.cache.clear()
+
+    def fold(self):
+        store = self.store
+        n = len(store)
+        if n == self.count:
+            return
+        if n < self.count:
+            self.reset()
+        start = self.count
+        days = store.timestamps[start:n] // 86400
+        kinds = store.kinds[start:n].astype(np.int64)
+        amounts = store.amounts[start:n].astype(np.int64, copy=False)
+        codes = store.category_codes[start:n]
+        first, last = int(days.min()), int(days.max())
+        # Month of each row, looked up from the months of the days in range rather than a datetime cast per row
+        day_months = np.arange(first, last + 1).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        months = day_months[days - first]
+
+        if not self.by_day.shape[1]:
+            self.first_day = first
+        if first < self.first_day or last >= self.first_day + self.by_day.shape[1]:
+            new_first = min(first, self.first_day)
+            self.by_day = _regrid(self.by_day, self.first_day, new_first,
+                                  max(last, self.first_day + self.by_day.shape[1] - 1) - new_first + 1)
+            self.first_day = new_first
+        self._add(self.by_day, kinds * self.by_day.shape[1] + (days - self.first_day), amounts)
+
+        first, last = int(months.min()), int(months.max())
+        _, categories, month_span = self.by_category_month.shape
+        if not month_span:
+            self.first_month = first
+        if first < self.first_month or last >= self.first_month + month_span:
+            new_first = min(first, self.first_month)
+            month_span = max(last, self.first_month + month_span - 1) - new_first + 1
+            self.by_category_month = _regrid(self.by_category_month, self.first_month, new_first, month_span)
+            self.first_month = new_first
+        if len(store.categories) > categories:
+            grown = np.zeros((2, len(store.categories), month_span), dtype=np.int64)
+            grown[:, :categories] = self.by_category_month
+            self.by_category_month = grown
+            categories = len(store.categories)
+        self._add(self.by_category_month, (kinds * categories + codes) * month_span + (months - self.first_month), amounts)
+        self.count = n
+        self.cache.clear()
+
+    def _add(self, grid, flat, amounts):
+        # Adds amounts into grid at the flat (C-order) cell indices
+        if len(flat) * self.DENSE_RATIO < grid.size:
+            np.add.at(grid.reshape(-1), flat, amounts)
+        else:
+            grid += np.rint(np.bincount(flat, weights=amounts, minlength=grid.size)).astype(np.int64).reshape(grid.shape)
+
+    def _balances(self):
+        self.balance_index.update(self.store)
+        return self.balance_index
+
+    def time_span(self):
+        # (first, last) transaction timestamps, or None for an empty ledger
+        times = self._balances().times
+        return (int(times[0]), int(times[-1])) if len(times) else None
+
+    def balance_at(self, ts):
+        return self._balances().balance_at(ts) / 100
+
+    def flow_between(self, start, end):
+        # (credit, debit, net) in rupees for start <= ts < end
+        credit, debit = self._balances().flow_between(start, end)
+        return credit / 100, debit / 100, (credit - debit) / 100
+
+    def samples(self, start=None, end=None, max_points=2000):
+        return self._balances().samples(start, end, max_points)
+
+    def _memo(self, key, compute):
+        self.fold()
+        result = self.cache.get(key)
+        if result is None:
+            result = self.cache[key] = compute()
+        return result
+
+    def _day_prefix(self):
+        # prefix[i] = debits on days before first_day + i, so any day range is two lookups
+        return self._memo(("day_prefix",), lambda: np.concatenate(([0], np.cumsum(self.by_day[DEBIT]))))
+
+    def debit_between_days(self, first, last):
+        # Total debit in paise for days [first, last)
+        prefix = self._day_prefix()
+        lo, hi = np.clip((first - self.first_day, last - self.first_day), 0, len(prefix) - 1)
+        return int(prefix[hi] - prefix[lo])
+
+    def _month_columns(self, month, months):
+        # Columns of by_category_month for the `months` months ending with `month`, clipped to the data
+        lo = month - months + 1 - self.first_month
+        hi = month + 1 - self.first_month
+        return max(lo, 0), max(min(hi, self.by_category_month.shape[2]), 0)
+
+    def category_by_month(self, months=6, ts=None):
+        # (month labels, [(category, [debit in rupees per month])]) for the last `months` months,
+        # only categories with some spend in that window
+        month = month_key(current_timestamp() if ts is None else ts)
+
+        def compute():
+            labels = [month_label(m) for m in range(month - months + 1, month + 1)]
+            table = np.zeros((self.by_category_month.shape[1], months), dtype=np.int64)
+            lo, hi = self._month_columns(month, months)
+            if lo < hi:
+                offset = lo - (month - months + 1 - self.first_month)
+                table[:, offset:offset + hi - lo] = self.by_category_month[DEBIT, :, lo:hi]
+            rows = np.flatnonzero(table.any(axis=1))
+            rows = rows[np.argsort(-table[rows].sum(axis=1), kind="stable")]
+            return labels, [(self.store.categories[code], (table[code] / 100).tolist()) for code in rows.tolist()]
+        return self._memo(("category_by_month", months, month), compute)
+
+    def burn_rate(self, window=30, ts=None):
+        # Average daily debit over the last `window` days and so far this month, and the month-end
+        # spend that the month-to-date rate projects. All in rupees.
+        ts = current_timestamp() if ts is None else ts
+        day = day_key(ts)
+
+        def compute():
+            start, end = month_bounds(ts)
+            month_first = start // 86400
+            days_in_month = (end - start) // 86400
+            elapsed = day - month_first + 1
+            month_spent = self.debit_between_days(month_first, day + 1)
+            month_rate = month_spent / elapsed
+            return {
+                "window": window,
+                "window_rate": self.debit_between_days(day - window + 1, day + 1) / window / 100,
+                "month_spent": month_spent / 100,
+                "month_rate": month_rate / 100,
+                "projected_month": month_rate * days_in_month / 100,
+                "today": self.debit_between_days(day, day + 1) / 100
+            }
+        return self._memo(("burn_rate", window, day), compute)
+
+    def budget_vs_actual(self, budgets, ts=None):
+        # [(category, budget, spent this month, remaining, fraction used)] for regular categories
+        month = month_key(current_timestamp() if ts is None else ts)
+
+        def compute():
+            names = list(budgets)
+            codes = np.array([-1 if self.store.find_category(c) is None else self.store.find_category(c) for c in names],
+                             dtype=np.int64)
+            spent = np.zeros(len(names), dtype=np.int64)
+            column = month - self.first_month
+            if len(names) and 0 <= column < self.by_category_month.shape[2]:
+                # Categories interned after the last folded row have no column yet and nothing spent
+                known = (codes >= 0) & (codes < self.by_category_month.shape[1])
+                spent[known] = self.by_category_month[DEBIT, codes[known], column]
+            budget = np.array([budgets[c] for c in names], dtype=float)
+            spent = spent / 100
+            used = np.divide(spent, budget, out=np.zeros_like(spent), where=budget > 0)
+            return list(zip(names, budget.tolist(), spent.tolist(), (budget - spent).tolist(), used.tolist()))
+        return self._memo(("budget_vs_actual", tuple(budgets.items()), month), compute)
+
+    def top_categories(self, n=5, months=None, ts=None):
+        # [(category, debit in rupees, share of all debit)] over all time, or the last `months` months
+        month = month_key(current_timestamp() if ts is None else ts)
+
+        def compute():
+            if months is None:
+                totals = self.by_category_month[DEBIT].sum(axis=1)
+            else:
+                lo, hi = self._month_columns(month, months)
+                totals = self.by_category_month[DEBIT, :, lo:hi].sum(axis=1)
+            overall = int(totals.sum())
+            order = np.argsort(-totals, kind="stable")[:n]
+            order = order[totals[order] > 0]
+            return [(self.store.categories[code], int(totals[code]) / 100, int(totals[code]) / overall)
+                    for code in order.tolist()]
+        return self._memo(("top_categories", n, months, None if months is None else month), compute)
@@ -0,0 +1,170 @@
+import ttkbootstrap as ttk
+from ledger import format_timestamp
+
+BUDGET_COLUMNS = (("Category", 180), ("Budget", 120), ("Spent", 120), ("Remaining", 120), ("Used", 80))
+TOP_COLUMNS = (("Rank", 60), ("Category", 200), ("Spent", 140), ("Share", 100))
+RANGES = (("1M", 30), ("3M", 91), ("1Y", 365), ("All", None))
+
+
+class ReportsPanel:
+    # Notebook of report tabs for the Reports view. Only the selected tab is filled, from the
+    # ledger's ReportEngine; the engine memoizes, so flipping between tabs re-reads cached results.
+    # The Trends tab holds the chart, which the app renders through on_trends, and the date range
+    # it shows: `view` is (start, end) or None for the whole history. Zoom and pan only change
+    # the range; the points for it come from the balance index.
+    def __init__(self, master, ledger, on_trends, months=6, top=10):
+        self.ledger = ledger
+        self.on_trends = on_trends
+        self.months = months
+        self.top = top
+        self.view = None
+        self.drag = None
+
+        self.notebook = ttk.Notebook(master, bootstyle="dark")
+        self.notebook.pack(fill="both", expand=True)
+        self.trends_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.trends_frame, text="📈 Trends")
+        toolbar = ttk.Frame(self.trends_frame)
+        toolbar.pack(side="top", fill="x", pady=(5, 5))
+        for text, days in RANGES:
+            ttk.Button(toolbar, text=text, bootstyle="secondary-outline", width=4,
+                       command=lambda d=days: self.set_span(d)).pack(side="left", padx=2)
+        for text, command in (("◀", lambda: self.pan(-0.5)), ("▶", lambda: self.pan(0.5)),
+                              ("＋", lambda: self.zoom(0.5)), ("－", lambda: self.zoom(2))):
+            ttk.Button(toolbar, text=text, bootstyle="secondary", width=3, command=command).pack(side="left", padx=2)
+        self.range_label = ttk.Label(toolbar, text="", font=("Segoe UI", 12))
+        self.range_label.pack(side="left", padx=10)
+        self.chart_area = ttk.Frame(self.trends_frame)
+        self.chart_area.pack(fill="both", expand=True)
+        self.category_tree = self._add_table("🗂 By Category", [("Category", 180)])
+        self.budget_tree = self._add_table("🎯 Budget vs Actual", BUDGET_COLUMNS)
+        self.top_tree = self._add_table("🏆 Top Categories", TOP_COLUMNS)
+
+        burn_frame = ttk.Frame(self.notebook, padding=20)
+        self.notebook.add(burn_frame, text="🔥 Burn Rate")
+        self.burn_labels = {}
+        for row, (key, text) in enumerate((("today", "Spent today"), ("window_rate", "Average per day (last 30 days)"),
+                                           ("month_spent", "Spent this month"), ("month_rate", "Average per day this month"),
+                                           ("projected_month", "Projected month total"))):
+            ttk.Label(burn_frame, text=f"{text}:", font=("Segoe UI", 16)).grid(row=row, column=0, sticky="w", pady=5)
+            self.burn_labels[key] = ttk.Label(burn_frame, text="", font=("Segoe UI", 16, "bold"), bootstyle="success")
+            self.burn_labels[key].grid(row=row, column=1, sticky="w", padx=20, pady=5)
+
+        self.tabs = {
+            str(self.trends_frame): self.show_trends,
+            str(self.category_tree.master): self.show_category_by_month,
+            str(self.budget_tree.master): self.show_budget,
+            str(self.top_tree.master): self.show_top_categories,
+            str(burn_frame): self.show_burn_rate
+        }
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.refresh())
+
+    def _add_table(self, title, columns):
+        frame = ttk.Frame(self.notebook)
+        self.notebook.add(frame, text=title)
+        scrollbar = ttk.Scrollbar(frame, orient="vertical")
+        scrollbar.pack(side="right", fill="y")
+        tree = ttk.Treeview(frame, show="headings", bootstyle="dark", yscrollcommand=scrollbar.set)
+        scrollbar.configure(command=tree.yview)
+        self._set_columns(tree, columns)
+        tree.pack(fill="both", expand=True)
+        return tree
+
+    def _set_columns(self, tree, columns):
+        tree.configure(columns=[name for name, _ in columns])
+        for name, width in columns:
+            tree.heading(name, text=name, anchor="center")
+            tree.column(name, width=width, anchor="center")
+
+    def _fill(self, tree, rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", "end", values=row)
+
+    def refresh(self):
+        self.tabs[self.notebook.select()]()
+
+    def attach_chart(self, widget):
+        # Mouse wheel zooms, dragging pans
+        widget.bind("<MouseWheel>", lambda e: self.zoom(0.8 if e.delta > 0 else 1.25))
+        widget.bind("<Button-4>", lambda e: self.zoom(0.8))
+        widget.bind("<Button-5>", lambda e: self.zoom(1.25))
+        widget.bind("<ButtonPress-1>", lambda e: setattr(self, "drag", e.x))
+        widget.bind("<B1-Motion>", lambda e: self._on_drag(e, widget))
+        widget.bind("<ButtonRelease-1>", lambda e: setattr(self, "drag", None))
+
+    def _on_drag(self, event, widget):
+        if self.drag is None or widget.winfo_width() <= 1:
+            return
+        fraction = (self.drag - event.x) / widget.winfo_width()
+        self.drag = event.x
+        self.pan(fraction)
+
+    def _current_view(self):
+        span = self.ledger.reports.time_span()
+        if span is None:
+            return None
+        return self.view or (span[0], max(span[1], span[0] + 86400))
+
+    def set_span(self, days):
+        span = self.ledger.reports.time_span()
+        if days is None or span is None:
+            self.view = None
+        else:
+            self.view = (span[1] - days * 86400, span[1])
+        self.show_trends()
+
+    def pan(self, fraction):
+        view = self._current_view()
+        if view is None:
+            return
+        first, last = self.ledger.reports.time_span()
+        width = view[1] - view[0]
+        # Keep at least half the window over the history
+        start = min(max(view[0] + int(width * fraction), first - width // 2), last - width // 2)
+        self.view = (start, start + width)
+        self.show_trends()
+
+    def zoom(self, factor):
+        view = self._current_view()
+        if view is None:
+            return
+        first, last = self.ledger.reports.time_span()
+        width = max(int((view[1] - view[0]) * factor), 3600)
+        if width >= last - first and factor > 1:
+            self.view = None
+        else:
+            center = (view[0] + view[1]) // 2
+            self.view = (center - width // 2, center + width // 2)
+        self.show_trends()
+
+    def show_trends(self):
+        view = self._current_view()
+        if view is not None:
+            reports = self.ledger.reports
+            credit, debit, net = reports.flow_between(view[0], view[1] + 1)
+            self.range_label.configure(
+                text=f"{format_timestamp(view[0])[:10]} – {format_timestamp(view[1])[:10]}   "
+                     f"In ₹{credit:.2f}  Out ₹{debit:.2f}  Net ₹{net:.2f}   "
+                     f"Balance at end ₹{reports.balance_at(view[1]):.2f}")
+        self.on_trends()
+
+    def show_category_by_month(self):
+        labels, rows = self.ledger.reports.category_by_month(self.months)
+        self._set_columns(self.category_tree, [("Category", 180)] + [(label, 110) for label in labels])
+        self._fill(self.category_tree, [(category, *(f"₹{value:.2f}" for value in values)) for category, values in rows])
+
+    def show_budget(self):
+        rows = self.ledger.reports.budget_vs_actual(self.ledger.regular_categories)
+        self._fill(self.budget_tree, [(category, f"₹{budget:.2f}", f"₹{spent:.2f}", f"₹{remaining:.2f}", f"{used:.0%}")
+                                      for category, budget, spent, remaining, used in rows])
+
+    def show_top_categories(self):
+        rows = self.ledger.reports.top_categories(self.top)
+        self._fill(self.top_tree, [(rank, category, f"₹{spent:.2f}", f"{share:.1%}")
+                                   for rank, (category, spent, share) in enumerate(rows, 1)])
+
+    def show_burn_rate(self):
+        burn = self.ledger.reports.burn_rate()
+        for key, label in self.burn_labels.items():
+            label.configure(text=f"₹{burn[key]:.2f}")
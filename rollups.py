@@ -0,0 +1,114 @@
+import os
+import zipfile
+import zlib
+import numpy as np
+from ledger import CREDIT, DEBIT
+from instrument import log
+
+ROLLUP_VERSION = 1
+TAIL_ROWS = 64
+ARRAYS = ("by_day", "by_month", "by_category", "by_category_month")
+
+
+def tail_fingerprint(store, count):
+    # CRC of the last TAIL_ROWS rows before `count`, all four columns
+    lo = max(count - TAIL_ROWS, 0)
+    crc = 0
+    for column in (store.timestamps, store.kinds, store.category_codes, store.amounts):
+        crc = zlib.crc32(np.ascontiguousarray(column[lo:count]).tobytes(), crc)
+    return crc
+
+
+class Rollups:
+    # Materialized totals saved next to settings.json so startup does not re-read every row:
+    # the balance, credit/debit per day, per month, per category and per (category, month), the
+    # number of rows they cover and a fingerprint of the last of those rows. The file carries a
+    # version and a checksum; a file that is damaged, from another version, or whose rows are no
+    # longer the start of the ledger is ignored and everything is rebuilt from the transactions.
+    def __init__(self, count, tail, credit, debit, first_day, first_month, categories, by_day, by_month,
+                 by_category, by_category_month):
+        self.count = count
+        self.tail = tail
+        self.credit = credit
+        self.debit = debit
+        self.first_day = first_day
+        self.first_month = first_month
+        self.categories = categories
+        self.by_day = by_day
+        self.by_month = by_month
+        self.by_category = by_category
+        self.by_category_month = by_category_month
+
+    @classmethod
+    def capture(cls, reports):
+        # Rollups of everything the report engine has seen, after folding in any new rows
+        reports.fold()
+        store = reports.store
+        by_category_month = reports.by_category_month
+        by_category = by_category_month.sum(axis=2)
+        return cls(reports.count, tail_fingerprint(store, reports.count), int(by_category[CREDIT].sum()),
+                   int(by_category[DEBIT].sum()), reports.first_day, reports.first_month,
+                   list(store.categories[:by_category_month.shape[1]]), reports.by_day,
+                   by_category_month.sum(axis=1), by_category, by_category_month)
+
+    def _header(self):
+        return np.array([ROLLUP_VERSION, self.count, self.tail, self.credit, self.debit, self.first_day, self.first_month],
+                        dtype=np.int64)
+
+    def _checksum(self, header, categories):
+        crc = zlib.crc32(header.tobytes())
+        crc = zlib.crc32("\0".join(categories).encode("utf-8"), crc)
+        for name in ARRAYS:
+            crc = zlib.crc32(np.ascontiguousarray(getattr(self, name), dtype=np.int64).tobytes(), crc)
+        return crc
+
+    def save(self, path):
+        header = self._header()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, header=header, categories=np.array(self.categories, dtype=str),
+                     checksum=np.array([self._checksum(header, self.categories)], dtype=np.int64),
+                     **{name: getattr(self, name) for name in ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def read(cls, path):
+        # None when the file is missing, unreadable, from another version or fails its checksum
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                header = data["header"]
+                if int(header[0]) != ROLLUP_VERSION:
+                    log.info("Ignoring rollups of version %d", int(header[0]))
+                    return None
+                _, count, tail, credit, debit, first_day, first_month = header.tolist()
+                rollups = cls(count, tail, credit, debit, first_day, first_month, data["categories"].tolist(),
+                              *(data[name] for name in ARRAYS))
+                checksum = int(data["checksum"][0])
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+            log.warning("Ignoring unreadable rollups %s: %s", path, e)
+            return None
+        if rollups._checksum(header, rollups.categories) != checksum:
+            log.warning("Ignoring rollups %s: checksum mismatch", path)
+            return None
+        return rollups
+
+    def matches(self, store):
+        # The ledger must still start with the rows the rollups were built from: at least as many
+        # rows, the same category codes and the same last rows
+        return (len(store) >= self.count and store.categories[:len(self.categories)] == self.categories
+                and tail_fingerprint(store, self.count) == self.tail)
+
+    def restore_spend_index(self, index):
+        # Fills a SpendIndex with the saved totals; rows past self.count still need add_batch()
+        index.reset()
+        for buckets, first, totals in ((index.by_day, self.first_day, self.by_day),
+                                       (index.by_month, self.first_month, self.by_month),
+                                       (index.by_category, 0, self.by_category)):
+            for offset in np.flatnonzero(totals.any(axis=0)).tolist():
+                buckets[first + offset] = [int(totals[CREDIT, offset]), int(totals[DEBIT, offset])]
+        index.totals = [self.credit, self.debit]
+
+    def restore_reports(self, reports):
+        reports.restore(self.count, self.first_day, self.by_day.copy(), self.first_month, self.by_category_month.copy())
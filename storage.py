@@ -0,0 +1,385 @@
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+from ledger_file import LedgerFile, write_ledger_file
+from ledger import TransactionStore, SpendIndex, TYPE_NAMES, TYPE_CODES, DEBIT, to_rupees, day_bounds, month_bounds
+
+
+class MemoryStorage:
+    # Storage interface used by WalletApp. This base keeps everything in the columnar store and
+    # answers limit checks from a SpendIndex; subclasses decide what reaches disk.
+    sync_interval = 1.0
+
+    def __init__(self):
+        self.store = None
+        self.spend_index = SpendIndex()
+        self.pending = 0
+
+    def load(self, rollups=None):
+        self.store = TransactionStore()
+        self.build_index(self.store, rollups)
+        return self.store
+
+    def has_data(self):
+        # Whether this backend already holds a wallet on disk
+        return False
+
+    def seed(self, store):
+        # Writes `store` as this backend's initial contents, before load()
+        pass
+
+    def files(self):
+        # The files that make up this backend's copy of the wallet
+        return []
+
+    def build_index(self, store, rollups=None):
+        # Saved rollups that still match the ledger stand in for the rows they cover
+        if rollups is not None and rollups.matches(store):
+            rollups.restore_spend_index(self.spend_index)
+            self.spend_index.add_batch(store, rollups.count)
+        else:
+            self.spend_index.rebuild(store)
+
+    def append(self, store, index):
+        self.spend_index.add(int(store.kinds[index]), int(store.category_codes[index]),
+                             int(store.amounts[index]), int(store.timestamps[index]))
+
+    def append_many(self, store, start):
+        # Rows [start, len(store)) were added in one batch
+        self.spend_index.add_batch(store, start)
+
+    def daily_debit(self, ts):
+        return self.spend_index.daily_debit(ts)
+
+    def monthly_debit(self, ts):
+        return self.spend_index.monthly_debit(ts)
+
+    def balance(self):
+        return self.spend_index.balance()
+
+    def sync(self):
+        pass
+
+    def close(self):
+        self.sync()
+
+
+class JournalStorage(MemoryStorage):
+    # Append-only JSONL journal plus a periodic columnar snapshot.
+    # Every transaction is one journal line; fsync is batched by count and age. When the journal
+    # tail grows past a fraction of the ledger it is folded into a fresh snapshot and truncated,
+    # so the amortized write cost per transaction stays constant. max_tail caps the tail on large
+    # ledgers, which bounds how many lines startup has to replay.
+    def __init__(self, journal_path="wallet_journal.jsonl", snapshot_path="wallet_snapshot.npz",
+                 legacy_path="wallet_data.json", sync_every=64, sync_interval=1.0,
+                 min_tail=10000, tail_ratio=0.25, max_tail=50000):
+        super().__init__()
+        self.journal_path = journal_path
+        self.snapshot_path = snapshot_path
+        self.legacy_path = legacy_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.min_tail = min_tail
+        self.tail_ratio = tail_ratio
+        self.max_tail = max_tail
+        self.tail = 0
+        self.last_sync = time.monotonic()
+        self._journal = None
+
+    def load(self, rollups=None):
+        store = self._load_snapshot()
+        if store is None:
+            store = TransactionStore()
+            if not os.path.exists(self.journal_path) and self.legacy_path and os.path.exists(self.legacy_path):
+                # First run on an existing wallet: seed from the old exported history
+                with open(self.legacy_path, "r") as f:
+                    store = TransactionStore.from_records(json.load(f))
+                self.snapshot(store)
+        self._replay(store)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self.store = store
+        self.build_index(store, rollups)
+        return store
+
+    def has_data(self):
+        return os.path.exists(self.snapshot_path) or (os.path.exists(self.journal_path)
+                                                      and os.path.getsize(self.journal_path) > 0)
+
+    def seed(self, store):
+        self.snapshot(store)
+
+    def files(self):
+        return [self.journal_path, self.snapshot_path]
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        with np.load(self.snapshot_path) as data:
+            return TransactionStore.from_columns(data["ts"], data["kind"], data["category"],
+                                                 data["amount"], data["categories"].tolist())
+
+    def _tail_limit(self, store):
+        return min(max(self.min_tail, len(store) * self.tail_ratio), self.max_tail)
+
+    @staticmethod
+    def _read_journal(data):
+        # (entries, bytes of intact lines). The lines are parsed as one JSON array; only when that
+        # fails is each line tried in turn, stopping at the first torn one.
+        lines = data.split(b"\n")
+        complete = lines[:-1]
+        try:
+            return json.loads(b"[" + b",".join(complete) + b"]"), len(data) - len(lines[-1])
+        except ValueError:
+            pass
+        entries = []
+        good_offset = 0
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # Torn write from a crash; everything after it is discarded
+                break
+            good_offset += len(line) + 1
+        return entries, min(good_offset, len(data))
+
+    def _replay(self, store):
+        # Parses the whole tail first and appends it with one extend()
+        self.tail = 0
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            data = f.read()
+        entries, good_offset = self._read_journal(data)
+        self.tail = len(entries)
+        # Lower seqs were folded into the snapshot before the journal was truncated
+        entries = [e for e in entries if e["seq"] >= len(store)]
+        if entries:
+            n = len(entries)
+            store.extend(np.fromiter((e["ts"] for e in entries), dtype=np.int64, count=n),
+                         np.fromiter((TYPE_CODES[e["type"]] for e in entries), dtype=np.uint8, count=n),
+                         np.fromiter((store.category_code(e["category"]) for e in entries), dtype=np.int32, count=n),
+                         np.fromiter((e["paise"] for e in entries), dtype=np.int64, count=n))
+        if good_offset < len(data):
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good_offset)
+
+    def _entry(self, store, index):
+        entry = {
+            "seq": index,
+            "ts": int(store.timestamps[index]),
+            "type": TYPE_NAMES[store.kinds[index]],
+            "category": store.categories[store.category_codes[index]],
+            "paise": int(store.amounts[index])
+        }
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def append_many(self, store, start):
+        super().append_many(store, start)
+        count = len(store) - start
+        if self.tail + count >= self._tail_limit(store):
+            # The batch would be compacted straight away, so write the snapshot directly
+            self.compact(store)
+            return
+        # Same line layout as _entry, formatted straight from the column slices
+        categories = [json.dumps(c, ensure_ascii=False) for c in store.categories]
+        self._journal.writelines(
+            f'{{"seq":{seq},"ts":{ts},"type":"{TYPE_NAMES[kind]}","category":{categories[code]},"paise":{paise}}}\n'
+            for seq, ts, kind, code, paise in zip(range(start, len(store)), store.timestamps[start:].tolist(),
+                                                  store.kinds[start:].tolist(), store.category_codes[start:].tolist(),
+                                                  store.amounts[start:].tolist()))
+        self.tail += count
+        self.pending += count
+        self.sync()
+
+    def append(self, store, index):
+        super().append(store, index)
+        self._journal.write(self._entry(store, index))
+        self.tail += 1
+        self.pending += 1
+        if self.pending >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+        if self.tail >= self._tail_limit(store):
+            self.compact(store)
+
+    def sync(self):
+        if self._journal is None or not self.pending:
+            return
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def snapshot(self, store):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, ts=store.timestamps, kind=store.kinds, category=store.category_codes,
+                     amount=store.amounts, categories=np.array(store.categories, dtype=str))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+    def compact(self, store):
+        self.sync()
+        self.snapshot(store)
+        # A crash between the snapshot and this truncate is harmless: replay skips seq < len(snapshot)
+        if self._journal is not None:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+        self.tail = 0
+
+    def close(self):
+        if self._journal is not None:
+            self.sync()
+            self._journal.close()
+            self._journal = None
+
+
+class MappedJournalStorage(JournalStorage):
+    # JournalStorage whose snapshot is the memory-mapped binary ledger file (ledger_file.py) instead
+    # of an .npz archive. Opening maps the file rather than reading it, and the store reads the
+    # mapped records in place until its first append. Replaying a journal tail is such an append,
+    # so close() folds any tail into the file and the next open maps it without copying.
+    def __init__(self, journal_path="wallet_ledger_journal.jsonl", snapshot_path="wallet_ledger.bin", **options):
+        super().__init__(journal_path, snapshot_path, **options)
+        self.mapped = None
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return None
+        self.mapped = LedgerFile(self.snapshot_path)
+        return self.mapped.store()
+
+    def snapshot(self, store):
+        # Drop our mapping first; some platforms refuse to replace a file that is still mapped
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+        write_ledger_file(self.snapshot_path, store)
+
+    def close(self):
+        if self._journal is not None and self.tail:
+            self.compact(self.store)
+        super().close()
+
+
+class SQLiteStorage(MemoryStorage):
+    # SQLite-backed storage (WAL mode). Limit checks are indexed range queries; the in-memory
+    # columns serve the history view, reports, exports and the running balance.
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS transactions ("
+        "id INTEGER PRIMARY KEY, ts INTEGER NOT NULL, type INTEGER NOT NULL, "
+        "category TEXT NOT NULL, amount INTEGER NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (ts)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type_date ON transactions (type, ts)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_category_date ON transactions (category, ts)",
+    )
+    # Ids are assigned by SQLite; rows are read back in id order, which is the order they were added
+    INSERT = "INSERT INTO transactions (ts, type, category, amount) VALUES (?, ?, ?, ?)"
+    DEBIT_BETWEEN = "SELECT COALESCE(SUM(amount), 0) FROM transactions WHERE type = ? AND ts >= ? AND ts < ?"
+
+    def __init__(self, path="wallet.db", legacy_path="wallet_data.json", sync_every=64, sync_interval=1.0):
+        super().__init__()
+        self.path = path
+        self.legacy_path = legacy_path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.conn = None
+
+    def _connect(self):
+        if self.conn is not None:
+            return
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            self.conn.execute(statement)
+        self.conn.commit()
+
+    def _insert(self, store, start=0):
+        self.conn.executemany(self.INSERT, (
+            (int(store.timestamps[i]), int(store.kinds[i]), store.categories[store.category_codes[i]], int(store.amounts[i]))
+            for i in range(start, len(store))))
+
+    def load(self, rollups=None):
+        # Limit checks are SQL queries here, so there is no spend index for rollups to restore
+        self._connect()
+        if self._count() == 0 and self.legacy_path and os.path.exists(self.legacy_path):
+            with open(self.legacy_path, "r") as f:
+                self._insert(TransactionStore.from_records(json.load(f)))
+            self.conn.commit()
+        self.store = self._load_columns()
+        return self.store
+
+    def has_data(self):
+        if not os.path.exists(self.path):
+            return False
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("SELECT EXISTS (SELECT 1 FROM transactions)").fetchone()[0] == 1
+        except sqlite3.OperationalError:
+            # No transactions table yet
+            return False
+        finally:
+            conn.close()
+
+    def seed(self, store):
+        self._connect()
+        self._insert(store)
+        self.conn.commit()
+
+    def files(self):
+        return [self.path, self.path + "-wal", self.path + "-shm"]
+
+    def _count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def _load_columns(self):
+        n = self._count()
+        store = TransactionStore(max(n, 1024))
+        cursor = self.conn.execute("SELECT ts, type, category, amount FROM transactions ORDER BY id")
+        while True:
+            chunk = cursor.fetchmany(65536)
+            if not chunk:
+                break
+            ts, kinds, categories, amounts = zip(*chunk)
+            store.extend(np.array(ts, dtype=np.int64), np.array(kinds, dtype=np.uint8),
+                         np.fromiter((store.category_code(c) for c in categories), dtype=np.int32, count=len(chunk)),
+                         np.array(amounts, dtype=np.int64))
+        return store
+
+    def append(self, store, index):
+        self.conn.execute(self.INSERT, (int(store.timestamps[index]), int(store.kinds[index]),
+                                        store.categories[store.category_codes[index]], int(store.amounts[index])))
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self.sync()
+
+    def append_many(self, store, start):
+        self._insert(store, start)
+        self.pending += len(store) - start
+        self.sync()
+
+    def _debit_between(self, start, end):
+        return to_rupees(self.conn.execute(self.DEBIT_BETWEEN, (DEBIT, start, end)).fetchone()[0])
+
+    def daily_debit(self, ts):
+        return self._debit_between(*day_bounds(ts))
+
+    def monthly_debit(self, ts):
+        return self._debit_between(*month_bounds(ts))
+
+    def balance(self):
+        return self.store.balance()
+
+    def sync(self):
+        if self.conn is not None and self.pending:
+            self.conn.commit()
+            self.pending = 0
+
+    def close(self):
+        if self.conn is not None:
+            self.sync()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,103 @@
+import http.client
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from core import Ledger
+from ingest import IngestClient, IngestServer, apply_to_ledger
+
+
+class IngestServerTest(unittest.TestCase):
+    # Runs the server on an ephemeral port with a thread standing in for the Tk poll loop
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.ledger = Ledger(self.data_dir)
+        self.server = IngestServer(lambda posts: apply_to_ledger(self.ledger, posts), port=0, token="secret")
+        self.server.start()
+        self.host, self.port = self.server.address[:2]
+        self.stopped = threading.Event()
+        self.pump = threading.Thread(target=self._drain, daemon=True)
+        self.pump.start()
+
+    def tearDown(self):
+        self.stopped.set()
+        self.pump.join(5)
+        self.server.stop()
+        self.ledger.close()
+        shutil.rmtree(self.data_dir)
+
+    def _drain(self):
+        while not self.stopped.is_set():
+            self.server.drain()
+            time.sleep(0.002)
+
+    def request(self, method, target, body=None, token="secret", **extra):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=10)
+        headers = {"Content-Type": "application/json", **extra}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        conn.request(method, target, body, headers)
+        response = conn.getresponse()
+        status, data = response.status, json.loads(response.read())
+        conn.close()
+        return status, data
+
+    def test_single_transaction(self):
+        status, data = self.request("POST", "/transactions", json.dumps(
+            {"type": "credit", "amount": "₹1,200", "category": "salary", "date": "2025-07-01 09:30"}))
+        self.assertEqual(status, 200)
+        self.assertEqual((data["accepted"], data["rejected"]), (1, 0))
+        self.assertEqual(data["results"], [{"index": 0}])
+        self.assertEqual(len(self.ledger.transactions), 1)
+        self.assertEqual(self.ledger.balance, 1200)
+        self.assertEqual(self.ledger.transactions.categories[self.ledger.transactions.category_codes[0]], "salary")
+
+    def test_batch_rejects_rows_individually(self):
+        status, data = self.request("POST", "/transactions", json.dumps([
+            {"type": "credit", "amount": 500, "category": "salary"},
+            {"type": "refund", "amount": 10},
+            {"type": "debit", "amount": 200, "category": "food"},
+            {"type": "debit", "amount": 1000, "category": "food"},
+        ]))
+        self.assertEqual(status, 200)
+        self.assertEqual((data["accepted"], data["rejected"]), (2, 2))
+        self.assertEqual(data["results"][0], {"index": 0})
+        self.assertIn("invalid type", data["results"][1]["error"])
+        self.assertEqual(data["results"][2], {"index": 1})
+        self.assertEqual(data["results"][3], {"error": "Insufficient balance"})
+        self.assertEqual(len(self.ledger.transactions), 2)
+        self.assertEqual(self.ledger.balance, 300)
+
+    def test_daily_warning_needs_force(self):
+        client = IngestClient(self.host, self.port, token="secret")
+        client.post({"type": "credit", "amount": 20000, "category": "salary"})
+        rent = {"type": "debit", "amount": 6000, "category": "rent"}
+        self.assertIn("daily limit", client.post(rent)["results"][0]["error"])
+        self.assertEqual(client.post(rent, force=True)["accepted"], 1)
+        client.close()
+        self.assertEqual(self.ledger.balance, 14000)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.request("POST", "/transactions", "{not json")[0], 400)
+        self.assertEqual(self.request("POST", "/transactions", "{}", token="wrong")[0], 401)
+        self.assertEqual(self.request("POST", "/elsewhere", "{}")[0], 404)
+        self.assertEqual(self.request("GET", "/transactions")[0], 405)
+        self.assertEqual(self.request("GET", "/health"), (200, {"status": "ok", "queued": 0}))
+        self.assertEqual(len(self.ledger.transactions), 0)
+
+    def test_web_pages_are_refused(self):
+        body = json.dumps({"type": "credit", "amount": 100, "category": "salary"})
+        # A cross-site form or fetch carries an Origin; a DNS-rebound page carries its own Host
+        self.assertEqual(self.request("POST", "/transactions", body, Origin="http://example.com")[0], 403)
+        self.assertEqual(self.request("POST", "/transactions", body, Host="evil.example:8765")[0], 403)
+        self.assertEqual(self.request("POST", "/transactions", body, Host=f"localhost:{self.port}")[0], 200)
+        self.assertEqual(self.request("POST", "/transactions", body, Host=f"[::1]:{self.port}")[0], 200)
+        self.assertEqual(len(self.ledger.transactions), 2)
+        with self.assertRaises(ValueError):
+            IngestServer(lambda posts: [], host="0.0.0.0")
+
+
+if __name__ == "__main__":
+    unittest.main()
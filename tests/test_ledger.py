@@ -0,0 +1,65 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from core import Ledger, TransactionRejected, WalletLocked
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+
+class LedgerLockTest(unittest.TestCase):
+    # Only one process may write a wallet's files at a time
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def test_second_writer_is_refused(self):
+        ledger = Ledger(self.data_dir)
+        self.addCleanup(ledger.close)
+        with self.assertRaises(WalletLocked):
+            Ledger(self.data_dir)
+        cli = subprocess.run([sys.executable, CLI, "--data-dir", self.data_dir, "add", "credit", "10", "salary"],
+                             capture_output=True, text=True)
+        self.assertEqual(cli.returncode, 1)
+        self.assertIn("already open", cli.stderr)
+        self.assertEqual(len(ledger.transactions), 0)
+
+    def test_lock_is_released_on_close(self):
+        Ledger(self.data_dir).close()
+        ledger = Ledger(self.data_dir)
+        ledger.add("salary", 10, "Credit")
+        ledger.close()
+        ledger.close()
+        ledger = Ledger(self.data_dir)
+        self.assertEqual(ledger.balance, 10)
+        ledger.close()
+
+
+class LedgerCheckTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.ledger = Ledger(self.data_dir)
+        self.addCleanup(self.ledger.close)
+
+    def test_amounts_that_do_not_fit_are_rejected(self):
+        for amount in (float("inf"), float("-inf"), float("nan"), 1e300, 1e13):
+            with self.assertRaises(TransactionRejected, msg=amount):
+                self.ledger.check("Credit", amount)
+        results = self.ledger.add_many([("salary", float("inf"), "Credit", None), ("salary", 10, "Credit", None)])
+        self.assertEqual([index for index, _ in results], [None, 0])
+        self.assertEqual(self.ledger.balance, 10)
+
+    def test_cli_reports_bad_input(self):
+        self.ledger.close()
+        for args in (["add", "credit", "inf", "salary"], ["add", "credit", "1e300", "salary"],
+                     ["balance", "--on", "2025-13-01"], ["history", "--from", "2025-02-30"]):
+            cli = subprocess.run([sys.executable, CLI, "--data-dir", self.data_dir] + args, capture_output=True, text=True)
+            self.assertNotEqual(cli.returncode, 0, args)
+            self.assertNotIn("Traceback", cli.stderr, args)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import rollups
+from core import Ledger, ROLLUPS_FILE
+from ledger import DEBIT, SpendIndex, TransactionStore, parse_date
+from reports import ReportEngine
+
+
+class RollupsTest(unittest.TestCase):
+    # Saved rollups must only be used while they describe the ledger on disk; every rejected file
+    # has to leave the same totals as folding all transactions from scratch
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        # Registered first so it runs after the ledgers opened by the tests are closed
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        ledger = Ledger(self.data_dir)
+        start = parse_date("2025-01-01 09:00:00")
+        rows = [("salary", 50000, "Credit", start)]
+        rows += [(("food", "rent", "travel")[i % 3], 10 + i, "Debit", start + i * 86400) for i in range(200)]
+        self.assertTrue(all(error is None for _, error in ledger.add_many(rows, force=True)))
+        ledger.close()
+        self.path = os.path.join(self.data_dir, ROLLUPS_FILE)
+
+    def assertFullFold(self, ledger):
+        fresh = ReportEngine(ledger.transactions)
+        fresh.fold()
+        ledger.reports.fold()
+        self.assertEqual((ledger.reports.first_day, ledger.reports.first_month), (fresh.first_day, fresh.first_month))
+        np.testing.assert_array_equal(ledger.reports.by_day, fresh.by_day)
+        np.testing.assert_array_equal(ledger.reports.by_category_month, fresh.by_category_month)
+        index = SpendIndex()
+        index.rebuild(ledger.transactions)
+        spend_index = ledger.storage.spend_index
+        self.assertEqual(spend_index.totals, index.totals)
+        self.assertEqual((spend_index.by_day, spend_index.by_month, spend_index.by_category),
+                         (index.by_day, index.by_month, index.by_category))
+
+    def reopen(self):
+        ledger = Ledger(self.data_dir)
+        self.addCleanup(ledger.close)
+        return ledger
+
+    def test_matching_rollups_are_used(self):
+        ledger = self.reopen()
+        self.assertEqual(ledger.saved_count, 201)
+        self.assertFullFold(ledger)
+
+    def test_corrupt_byte(self):
+        with open(self.path, "r+b") as f:
+            f.seek(os.path.getsize(self.path) // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        self.assertIsNone(rollups.Rollups.read(self.path))
+        ledger = self.reopen()
+        self.assertIsNone(ledger.saved_count)
+        self.assertFullFold(ledger)
+
+    def test_checksum_mismatch(self):
+        # A well-formed archive whose totals no longer match its checksum
+        with np.load(self.path) as data:
+            arrays = {name: data[name] for name in data.files}
+        arrays["by_day"] = arrays["by_day"] + 1
+        with open(self.path, "wb") as f:
+            np.savez(f, **arrays)
+        self.assertIsNone(rollups.Rollups.read(self.path))
+        ledger = self.reopen()
+        self.assertIsNone(ledger.saved_count)
+        self.assertFullFold(ledger)
+
+    def test_other_version(self):
+        with mock.patch.object(rollups, "ROLLUP_VERSION", rollups.ROLLUP_VERSION + 1):
+            self.assertIsNone(rollups.Rollups.read(self.path))
+            ledger = self.reopen()
+            self.assertIsNone(ledger.saved_count)
+            self.assertFullFold(ledger)
+
+    def test_changed_row_before_count(self):
+        # Rewrites the amount of a row the rollups cover. The fingerprint covers the last
+        # TAIL_ROWS rows before count, so the row is taken from inside that window.
+        journal = os.path.join(self.data_dir, "wallet_journal.jsonl")
+        with open(journal) as f:
+            entries = [json.loads(line) for line in f]
+        entries[-2]["paise"] += 100000
+        with open(journal, "w") as f:
+            f.writelines(json.dumps(entry) + "\n" for entry in entries)
+        ledger = self.reopen()
+        self.assertIsNone(ledger.saved_count)
+        self.assertFullFold(ledger)
+        self.assertEqual(ledger.balance, 50000 - sum(10 + i for i in range(200)) - 1000)
+
+
+class ReportFoldTest(unittest.TestCase):
+    # Folding rows one at a time (cell by cell) must give the same grids as one bulk fold
+    def test_small_batches_match_bulk_fold(self):
+        store = TransactionStore()
+        start = parse_date("2025-01-01 09:00:00")
+        for i in range(300):
+            store.append(start + i * 86400, i % 2, f"category {i % 40}", 100 + i)
+        incremental = ReportEngine(store)
+        incremental.fold()
+        # Dates outside the grid, including one decades back, and new categories
+        for i, ts in enumerate((start + 5 * 86400, parse_date("1990-06-01 00:00:00"), start + 400 * 86400, start)):
+            store.append(ts, DEBIT, f"late {i % 2}", 7 + i)
+            incremental.fold()
+        fresh = ReportEngine(store)
+        fresh.fold()
+        self.assertEqual((incremental.first_day, incremental.first_month), (fresh.first_day, fresh.first_month))
+        np.testing.assert_array_equal(incremental.by_day, fresh.by_day)
+        np.testing.assert_array_equal(incremental.by_category_month, fresh.by_category_month)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from core import Ledger
+from ledger import CREDIT
+from storage import JournalStorage, SQLiteStorage
+
+
+class JournalRecoveryTest(unittest.TestCase):
+    # The journal must come back after a crash with every intact line and nothing else
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        self.journal_path = os.path.join(self.data_dir, "wallet_journal.jsonl")
+
+    def open(self, **options):
+        storage = JournalStorage(self.journal_path, os.path.join(self.data_dir, "wallet_snapshot.npz"),
+                                 legacy_path=None, **options)
+        return storage, storage.load()
+
+    def add(self, storage, store, count, first=0):
+        for i in range(first, first + count):
+            index = store.append(1750000000 + i * 3600, i % 2, f"category {i % 3}", 100 + i)
+            storage.append(store, index)
+
+    def columns(self, store):
+        return store.timestamps.copy(), store.kinds.copy(), store.category_codes.copy(), store.amounts.copy()
+
+    def assertSameRows(self, store, columns, count):
+        for actual, expected in zip(self.columns(store), columns):
+            np.testing.assert_array_equal(actual, expected[:count])
+
+    def test_replay_restores_rows(self):
+        storage, store = self.open()
+        self.add(storage, store, 50)
+        expected, balance = self.columns(store), store.balance_paise
+        storage.close()
+        storage, store = self.open()
+        self.assertSameRows(store, expected, 50)
+        self.assertEqual(store.balance_paise, balance)
+        self.assertEqual(storage.tail, 50)
+        storage.close()
+
+    def test_torn_last_line(self):
+        storage, store = self.open()
+        self.add(storage, store, 20)
+        expected = self.columns(store)
+        storage.close()
+        intact = os.path.getsize(self.journal_path)
+        with open(self.journal_path, "ab") as f:
+            f.write(b'{"seq":20,"ts":17500')
+        storage, store = self.open()
+        self.assertSameRows(store, expected, 20)
+        self.assertEqual(os.path.getsize(self.journal_path), intact)
+        # Appends after recovery land on a clean line boundary
+        self.add(storage, store, 1, first=20)
+        storage.close()
+        storage, store = self.open()
+        self.assertEqual(len(store), 21)
+        storage.close()
+
+    def test_corrupt_line_drops_the_rest(self):
+        storage, store = self.open()
+        self.add(storage, store, 20)
+        expected = self.columns(store)
+        storage.close()
+        with open(self.journal_path, "rb") as f:
+            lines = f.read().split(b"\n")
+        lines[10] = lines[10][:15]
+        with open(self.journal_path, "wb") as f:
+            f.write(b"\n".join(lines))
+        storage, store = self.open()
+        self.assertSameRows(store, expected, 10)
+        storage.close()
+
+    def test_crash_between_snapshot_and_truncate(self):
+        storage, store = self.open()
+        self.add(storage, store, 30)
+        expected = self.columns(store)
+        # The snapshot is written but the journal is never truncated
+        storage.sync()
+        storage.snapshot(store)
+        storage.close()
+        storage, store = self.open()
+        self.assertSameRows(store, expected, 30)
+        storage.close()
+
+    def test_tail_is_capped(self):
+        storage, store = self.open(min_tail=10, tail_ratio=10.0, max_tail=25)
+        self.add(storage, store, 60)
+        self.assertLess(storage.tail, 25)
+        expected = self.columns(store)
+        storage.close()
+        storage, store = self.open(min_tail=10, tail_ratio=10.0, max_tail=25)
+        self.assertSameRows(store, expected, 60)
+        storage.close()
+
+
+class BackendSwitchTest(unittest.TestCase):
+    # Changing storage_backend on an existing wallet must keep every transaction
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def open(self, backend):
+        with open(os.path.join(self.data_dir, "settings.json"), "w") as f:
+            json.dump({"storage_backend": backend}, f)
+        ledger = Ledger(self.data_dir)
+        self.addCleanup(ledger.close)
+        return ledger
+
+    def switch(self, backends):
+        ledger = self.open(backends[0])
+        # Large enough that the journal backend compacts most of it into its snapshot
+        ledger.add_many([("salary", 10, "Credit", 1750000000 + i) for i in range(12001)], force=True)
+        ledger.close()
+        count = 12001
+        for backend in backends[1:]:
+            ledger = self.open(backend)
+            self.assertEqual(len(ledger.transactions), count, backend)
+            self.assertEqual(ledger.balance, count * 10, backend)
+            ledger.add("salary", 10, "Credit")
+            ledger.close()
+            count += 1
+
+    def test_journal_and_sqlite(self):
+        self.switch(["journal", "sqlite", "journal", "sqlite"])
+
+    def test_with_binary(self):
+        self.switch(["journal", "binary", "journal", "sqlite", "binary", "sqlite", "journal"])
+
+    def test_sqlite_ids_do_not_follow_the_store(self):
+        # Row ids come from SQLite, so rows another connection added cannot collide with ours
+        path = os.path.join(self.data_dir, "wallet.db")
+        first, second = SQLiteStorage(path, legacy_path=None), SQLiteStorage(path, legacy_path=None)
+        stores = first.load(), second.load()
+        for storage, store, paise in ((first, stores[0], 1000), (second, stores[1], 500), (first, stores[0], 100)):
+            storage.append(store, store.append(1750000000, CREDIT, "salary", paise))
+            storage.sync()
+        first.close()
+        second.close()
+        third = SQLiteStorage(path, legacy_path=None)
+        self.assertEqual(third.load().balance_paise, 1600)
+        third.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
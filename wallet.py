@@ -1,50 +1,88 @@
+import time
+STARTED_AT = time.perf_counter()
 import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from ttkbootstrap.tooltip import ToolTip
-from tkinter import messagebox
-from datetime import datetime
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+from tkinter import messagebox, filedialog
 import json
 import os
+from core import Ledger, TransactionRejected, WalletLocked
+from history_view import VirtualHistoryView
+from worker import BackgroundWorker
+from ingest import IngestServer, apply_to_ledger
+from recurring import RecurringSchedule, TimerQueue
+from ledger import current_timestamp, format_timestamp, parse_date
+from widgets import CategoryList, FieldValidator, amount_error
+from instrument import configure, log, metrics, timed
 
 class WalletApp:
+    # Local API poll intervals while posts are arriving and while it is idle
+    INGEST_ACTIVE_MS = 10
+    INGEST_IDLE_MS = 100
+    # Repeat choices that keep or end a regular category's recurring schedule
+    REPEAT_UNCHANGED = "Unchanged"
+    REPEAT_STOP = "Stop repeating"
+
     def __init__(self, root):
-        print("WalletApp v3 - TIGHT scrollbars and ₹5000 limit dialog - August 2025")  # Debug to confirm code version
+        log.info("WalletApp v3 - TIGHT scrollbars and ₹5000 limit dialog - August 2025")
         self.root = root
         self.root.title("My Wallet - Premium")
         self.root.geometry("1280x800")
 
-        self.transaction_history = []
-        self.current_balance = 0
-        self.credit_amounts = []
-        self.debit_amounts = []
-        self.net_balance = []
-        self.regular_categories = {}
+        self.ledger = None
+        self.sync_job = None
+        self.chart = None
+        self.chart_image = None
+        self.reports_panel = None
+        self.chart_dirty = True
+        self.current_view = None
+        self.views = {}
+        self.input_frame = None
+        self.category_entry = None
+        self.chart_frame = None
+        self.settings_frame = None
+        self.biometric_var = None
+        self.first_frame_ms = None
+        self.import_job = None
+        self.export_job = None
+        self.export_worker = None
+        self.ingest = None
+        self.ingest_job = None
         self.user_name = None
         self.pin = None
         self.biometric_enabled = False
-        self.daily_limit = 0.0
-        self.monthly_limit = 0.0
-        
+
         self.greeting_label = None
         self.categories_display_frame = None
         self.amount_var = None
 
-        if os.path.exists("regular_categories.json"):
-            with open("regular_categories.json", "r") as f:
-                self.regular_categories = json.load(f)
-        if os.path.exists("settings.json"):
-            with open("settings.json", "r") as f:
-                settings = json.load(f)
-                self.user_name = settings.get("user_name", "Anna")
-                self.pin = settings.get("pin")
-                self.biometric_enabled = settings.get("biometric_enabled", False)
-                self.daily_limit = settings.get("daily_limit", 0.0)
-                self.monthly_limit = settings.get("monthly_limit", 0.0)
+        self.worker = BackgroundWorker(self.root)
+        try:
+            self.ledger = Ledger()
+        except WalletLocked as e:
+            messagebox.showerror("Wallet In Use", str(e), bootstyle="danger")
+            self.root.destroy()
+            raise SystemExit(1)
+        self.ledger.writer = self.write_file
+        configure(self.ledger.settings)
+        self.recurring = RecurringSchedule(self.ledger)
+        self.recurring_timer = TimerQueue(self.root, self.post_recurring)
+        self.user_name = self.ledger.settings.get("user_name", "Anna")
+        self.pin = self.ledger.settings.get("pin")
+        self.biometric_enabled = self.ledger.settings.get("biometric_enabled", False)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.setup_ui()
+        if self.ledger.settings.get("ingest_enabled", False):
+            error = self.start_ingest()
+            if error is not None:
+                # Usually another wallet or 'cli.py serve' holds the port; the API stays off until re-enabled
+                self.ledger.update_settings(ingest_enabled=False)
+                self.root.after_idle(lambda: messagebox.showwarning(
+                    "Local API", f"Could not start the local API: {error}", bootstyle="warning"))
+        # Occurrences that fell due while the wallet was closed are posted before the first frame
+        self.post_recurring(None, current_timestamp())
+        self.reschedule_recurring()
 
     def setup_ui(self):
         self.style = ttk.Style("darkly")
@@ -68,7 +106,7 @@ class WalletApp:
         header.pack(fill="x", pady=10)
         self.greeting_label = ttk.Label(header, text=f"Hello, {self.user_name}", font=("Segoe UI", 26, "bold"), bootstyle="light")
         self.greeting_label.pack(side="left", padx=20)
-        self.balance_label = ttk.Label(header, text=f"Total Balance: ₹{self.current_balance}", font=("Segoe UI", 22, "bold"), bootstyle="success")
+        self.balance_label = ttk.Label(header, text=f"Total Balance: ₹{self.ledger.balance}", font=("Segoe UI", 22, "bold"), bootstyle="success")
         self.balance_label.pack(side="left", padx=20)
         self.disposable_label = ttk.Label(header, text=f"Disposable Balance: ₹{self.get_disposable_balance()}", font=("Segoe UI", 22, "bold"), bootstyle="success")
         self.disposable_label.pack(side="left", padx=20)
@@ -80,6 +118,7 @@ class WalletApp:
         # Home View
         self.home_frame = ttk.Frame(self.main_content, bootstyle="dark")
         self.home_frame.grid(row=0, column=0, sticky="nsew")
+        self.views["Home"] = self.home_frame
         self.main_content.grid_rowconfigure(0, weight=1)
         self.main_content.grid_columnconfigure(0, weight=1)
 
@@ -89,6 +128,7 @@ class WalletApp:
         self.home_frame.grid_columnconfigure(1, weight=1)
 
         self.category_entries = []
+        self.category_validators = []
         for i in range(5):
             row = ttk.Frame(cat_frame)
             row.grid(row=i, column=0, sticky="ew", pady=5)
@@ -97,20 +137,54 @@ class WalletApp:
             cat_entry.grid(row=0, column=1, padx=5)
             ToolTip(cat_entry, text="Enter category name", bootstyle="inverse")
             ttk.Label(row, text="Amount:", font=("Segoe UI", 16)).grid(row=0, column=2, padx=5)
-            amt_entry = ttk.Entry(row, width=10, font=("Segoe UI", 16))
+            amt_var = tk.StringVar()
+            amt_entry = ttk.Entry(row, textvariable=amt_var, width=10, font=("Segoe UI", 16))
             amt_entry.grid(row=0, column=3, padx=5)
-            ToolTip(amt_entry, text="Enter expected amount in ₹", bootstyle="inverse")
-            self.category_entries.append((cat_entry, amt_entry))
+            self.category_validators.append(FieldValidator(amt_entry, amt_var, amount_error, "Enter expected amount in ₹", style="default"))
+            ttk.Label(row, text="Repeat:", font=("Segoe UI", 16)).grid(row=0, column=4, padx=5)
+            repeat_entry = ttk.Combobox(row, values=[self.REPEAT_UNCHANGED, "Debit", "Credit", self.REPEAT_STOP], width=14,
+                                        state="readonly", font=("Segoe UI", 16))
+            repeat_entry.set(self.REPEAT_UNCHANGED)
+            repeat_entry.grid(row=0, column=5, padx=5)
+            ToolTip(repeat_entry, text="Debit or Credit posts this amount automatically every month; "
+                                       "Unchanged keeps the category's current schedule", bootstyle="inverse")
+            day_entry = ttk.Spinbox(row, from_=1, to=31, width=3, font=("Segoe UI", 16))
+            day_entry.set(1)
+            day_entry.grid(row=0, column=6, padx=5)
+            ToolTip(day_entry, text="Day of the month it falls due", bootstyle="inverse")
+            cat_entry.bind("<FocusOut>", lambda e, fields=(cat_entry, repeat_entry, day_entry): self.show_schedule(*fields))
+            self.category_entries.append((cat_entry, amt_entry, repeat_entry, day_entry))
 
         save_cat_btn = ttk.Button(cat_frame, text="💾 Save Categories", command=self.save_categories, bootstyle="primary")
-        save_cat_btn.grid(row=5, column=0, columnspan=4, pady=10)
+        save_cat_btn.grid(row=5, column=0, columnspan=7, pady=10)
         ToolTip(save_cat_btn, text="Save regular categories", bootstyle="inverse")
 
         self.categories_display_frame = ttk.Labelframe(self.home_frame, text="📋 Regular Categories", padding=10, bootstyle="primary")
         self.categories_display_frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+        self.category_list = CategoryList(self.categories_display_frame)
         self.update_categories_display()
 
-        # Transactions View
+        # Transaction History (Lower Half, Left Side)
+        self.lower_frame = ttk.Frame(self.root)
+        self.lower_frame.pack(fill="x", padx=20, pady=(0, 20))
+        self.lower_frame.grid_columnconfigure(0, weight=1)
+        self.lower_frame.grid_columnconfigure(1, weight=1)
+
+        self.history_frame = ttk.Labelframe(self.lower_frame, text="🕒 Transaction History", padding=0, bootstyle="primary")
+        self.history_frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
+        
+        self.history_view = VirtualHistoryView(self.history_frame, self.ledger.transactions)
+
+        self.view_builders = {
+            "Transactions": self.build_transactions_view,
+            "Reports": self.build_reports_view,
+            "Settings": self.build_settings_view
+        }
+        self.update_balance_labels()
+        self.switch_view("Home")
+        self.root.bind("<Map>", self.on_first_frame, add="+")
+
+    def build_transactions_view(self):
         self.input_frame = ttk.Labelframe(self.main_content, text="➕ Add Transaction", padding=15, bootstyle="primary")
         self.input_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 20))
 
@@ -120,7 +194,7 @@ class WalletApp:
         ttk.Checkbutton(self.input_frame, text="Debit", variable=self.debit_var, bootstyle="danger-round-toggle").grid(row=0, column=1, padx=10, pady=10, sticky="w")
 
         ttk.Label(self.input_frame, text="Category", font=("Segoe UI", 16)).grid(row=1, column=0, pady=10, sticky="w")
-        self.category_entry = ttk.Combobox(self.input_frame, values=list(self.regular_categories.keys()), font=("Segoe UI", 16), bootstyle="dark")
+        self.category_entry = ttk.Combobox(self.input_frame, values=list(self.ledger.regular_categories.keys()), font=("Segoe UI", 16), bootstyle="dark")
         self.category_entry.grid(row=1, column=1, pady=10, sticky="w")
         ToolTip(self.category_entry, text="Select or enter a category", bootstyle="inverse")
 
@@ -128,8 +202,7 @@ class WalletApp:
         self.amount_var = tk.StringVar()
         self.amount_entry = ttk.Entry(self.input_frame, textvariable=self.amount_var, width=25, font=("Segoe UI", 16), bootstyle="dark")
         self.amount_entry.grid(row=2, column=1, pady=10, sticky="w")
-        ToolTip(self.amount_entry, text="Enter amount in ₹", bootstyle="inverse")
-        self.amount_var.trace("w", self.validate_amount)
+        self.amount_validator = FieldValidator(self.amount_entry, self.amount_var, amount_error, "Enter amount in ₹")
 
         self.amount_entry.bind("<Return>", lambda event: self.save_transaction())
         self.category_entry.bind("<Return>", lambda event: self.amount_entry.focus_set())
@@ -145,52 +218,31 @@ class WalletApp:
         ToolTip(view_btn, text="View transaction history", bootstyle="inverse")
         export_btn = ttk.Button(action_frame, text="⬇ Export Data", command=self.export_data, bootstyle="secondary")
         export_btn.grid(row=0, column=1, padx=10)
-        ToolTip(export_btn, text="Export transactions to JSON", bootstyle="inverse")
+        ToolTip(export_btn, text="Export the transactions shown by the history filters to JSON, JSON Lines or CSV", bootstyle="inverse")
         test_dialog_btn = ttk.Button(action_frame, text="🔔 Test Dialog", command=self.test_dialog, bootstyle="secondary")
         test_dialog_btn.grid(row=0, column=2, padx=10)
         ToolTip(test_dialog_btn, text="Test dialog functionality", bootstyle="inverse")
-
-        # Reports View
-        self.chart_frame = ttk.Labelframe(self.main_content, text="📈 Transaction Chart", padding=15, bootstyle="primary")
+        import_btn = ttk.Button(action_frame, text="⬆ Import Statement", command=self.import_statement, bootstyle="secondary")
+        import_btn.grid(row=0, column=3, padx=10)
+        ToolTip(import_btn, text="Import transactions from a CSV, JSON or JSONL bank statement", bootstyle="inverse")
+
+        self.import_progress = ttk.Progressbar(self.input_frame, maximum=100, bootstyle="success-striped")
+        self.import_status = ttk.Label(self.input_frame, text="", font=("Segoe UI", 12))
+        self.export_progress = ttk.Progressbar(self.input_frame, maximum=100, bootstyle="info-striped")
+        self.export_status = ttk.Frame(self.input_frame)
+        self.export_status_label = ttk.Label(self.export_status, text="", font=("Segoe UI", 12))
+        self.export_status_label.pack(side="left")
+        ttk.Button(self.export_status, text="Cancel", command=self.cancel_export, bootstyle="danger-outline").pack(side="left", padx=10)
+        return self.input_frame
+
+    def build_reports_view(self):
+        from reports_view import ReportsPanel
+        self.chart_frame = ttk.Labelframe(self.main_content, text="📈 Reports", padding=15, bootstyle="primary")
         self.chart_frame.grid(row=0, column=0, sticky="nsew")
+        self.reports_panel = ReportsPanel(self.chart_frame, self.ledger, self.render_graph)
+        return self.chart_frame
 
-        # Transaction History (Lower Half, Left Side)
-        self.lower_frame = ttk.Frame(self.root)
-        self.lower_frame.pack(fill="x", padx=20, pady=(0, 20))
-        self.lower_frame.grid_columnconfigure(0, weight=1)
-        self.lower_frame.grid_columnconfigure(1, weight=1)
-
-        self.history_frame = ttk.Labelframe(self.lower_frame, text="🕒 Transaction History", padding=0, bootstyle="primary")
-        self.history_frame.grid(row=0, column=0, sticky="nsew", padx=0, pady=0)
-        
-        # Create a canvas and scrollbars for the Treeview
-        history_canvas = tk.Canvas(self.history_frame, height=200, bg="#1e293b", highlightthickness=0)
-        history_canvas.pack(side="left", fill="both", expand=True, padx=0, pady=0)
-
-        v_scrollbar = ttk.Scrollbar(self.history_frame, orient="vertical", command=history_canvas.yview)
-        v_scrollbar.pack(side="right", fill="y", padx=0, pady=0)
-        
-        h_scrollbar = ttk.Scrollbar(self.history_frame, orient="horizontal", command=history_canvas.xview)
-        h_scrollbar.pack(side="bottom", fill="x", padx=0, pady=0)
-
-        history_inner_frame = ttk.Frame(history_canvas)
-        history_canvas.create_window((0, 0), window=history_inner_frame, anchor="nw")
-
-        self.history_list = ttk.Treeview(history_inner_frame, columns=("Date", "Type", "Category", "Amount"), show="headings", bootstyle="dark")
-        self.history_list.heading("Date", text="Date", anchor="center")
-        self.history_list.heading("Type", text="Type", anchor="center")
-        self.history_list.heading("Category", text="Category", anchor="center")
-        self.history_list.heading("Amount", text="Amount", anchor="center")
-        self.history_list.column("Date", width=200, anchor="center")
-        self.history_list.column("Type", width=100, anchor="center")
-        self.history_list.column("Category", width=150, anchor="center")
-        self.history_list.column("Amount", width=100, anchor="center")
-        self.history_list.pack(fill="both", expand=True, padx=0, pady=0)
-
-        history_inner_frame.bind("<Configure>", lambda e: history_canvas.configure(scrollregion=history_canvas.bbox("all")))
-        history_canvas.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
-
-        # Settings View
+    def build_settings_view(self):
         self.settings_frame = ttk.Frame(self.main_content, bootstyle="dark")
         self.settings_frame.grid(row=0, column=0, sticky="nsew")
 
@@ -224,56 +276,71 @@ class WalletApp:
         limits_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=10)
         ttk.Label(limits_frame, text="Daily Limit (₹):", font=("Segoe UI", 16)).pack(side="left", padx=5)
         self.daily_limit_entry = ttk.Entry(limits_frame, width=10, font=("Segoe UI", 16), bootstyle="dark")
-        self.daily_limit_entry.insert(0, str(self.daily_limit))
+        self.daily_limit_entry.insert(0, str(self.ledger.daily_limit))
         self.daily_limit_entry.pack(side="left", padx=5)
         ToolTip(self.daily_limit_entry, text="Enter daily transaction limit", bootstyle="inverse")
         ttk.Label(limits_frame, text="Monthly Limit (₹):", font=("Segoe UI", 16)).pack(side="left", padx=5)
         self.monthly_limit_entry = ttk.Entry(limits_frame, width=10, font=("Segoe UI", 16), bootstyle="dark")
-        self.monthly_limit_entry.insert(0, str(self.monthly_limit))
+        self.monthly_limit_entry.insert(0, str(self.ledger.monthly_limit))
         self.monthly_limit_entry.pack(side="left", padx=5)
         ToolTip(self.monthly_limit_entry, text="Enter monthly transaction limit", bootstyle="inverse")
         update_limits_btn = ttk.Button(limits_frame, text="Update Limits", command=self.update_limits, bootstyle="primary")
         update_limits_btn.pack(side="left", padx=5)
         ToolTip(update_limits_btn, text="Update transaction limits", bootstyle="inverse")
 
-        self.update_graph()
-        self.update_balance_labels()
-        self.switch_view("Home")
-
-    def validate_amount(self, *args):
-        value = self.amount_var.get()
-        try:
-            if value:
-                amount = float(value)
-                if amount < 0:
-                    self.amount_entry.configure(bootstyle="danger")
-                    ToolTip(self.amount_entry, text="Amount cannot be negative", bootstyle="danger")
-                else:
-                    self.amount_entry.configure(bootstyle="dark")
-                    ToolTip(self.amount_entry, text="Enter amount in ₹", bootstyle="inverse")
-            else:
-                self.amount_entry.configure(bootstyle="dark")
-                ToolTip(self.amount_entry, text="Enter amount in ₹", bootstyle="inverse")
-        except ValueError:
-            self.amount_entry.configure(bootstyle="danger")
-            ToolTip(self.amount_entry, text="Enter a valid number", bootstyle="danger")
+        diagnostics_frame = ttk.Labelframe(self.settings_frame, text="🩺 Diagnostics", padding=10, bootstyle="primary")
+        diagnostics_frame.grid(row=3, column=0, sticky="ew", padx=10, pady=10)
+        self.instrumentation_var = tk.BooleanVar(value=metrics.enabled)
+        instrumentation_check = ttk.Checkbutton(diagnostics_frame, text="Collect Timings", variable=self.instrumentation_var,
+                                                command=self.toggle_instrumentation, bootstyle="primary-round-toggle")
+        instrumentation_check.pack(side="left", padx=5)
+        ToolTip(instrumentation_check, text="Record per-operation timings and counters", bootstyle="inverse")
+        self.profile_btn = ttk.Button(diagnostics_frame, text="Stop Profiling" if metrics.profiling else "Start Profiling",
+                                      command=self.toggle_profiling, bootstyle="secondary")
+        self.profile_btn.pack(side="left", padx=5)
+        ToolTip(self.profile_btn, text="Capture a cProfile and tracemalloc profile", bootstyle="inverse")
+        dump_btn = ttk.Button(diagnostics_frame, text="Dump Timings", command=self.dump_metrics, bootstyle="secondary")
+        dump_btn.pack(side="left", padx=5)
+        ToolTip(dump_btn, text="Write collected timings to wallet_metrics.json", bootstyle="inverse")
+
+        api_frame = ttk.Labelframe(self.settings_frame, text="🔌 Local API", padding=10, bootstyle="primary")
+        api_frame.grid(row=4, column=0, sticky="ew", padx=10, pady=10)
+        self.ingest_var = tk.BooleanVar(value=self.ingest is not None)
+        ingest_check = ttk.Checkbutton(api_frame, text="Accept Posted Transactions", variable=self.ingest_var,
+                                       command=self.toggle_ingest, bootstyle="primary-round-toggle")
+        ingest_check.pack(side="left", padx=5)
+        ToolTip(ingest_check, text="Let scripts on this computer POST transactions to http://127.0.0.1:<port>/transactions",
+                bootstyle="inverse")
+        ttk.Label(api_frame, text="Port:", font=("Segoe UI", 16)).pack(side="left", padx=5)
+        self.ingest_port_entry = ttk.Entry(api_frame, width=6, font=("Segoe UI", 16), bootstyle="dark")
+        self.ingest_port_entry.insert(0, str(self.ledger.settings.get("ingest_port", 8765)))
+        self.ingest_port_entry.pack(side="left", padx=5)
+        return self.settings_frame
 
     def test_dialog(self):
         try:
             response = messagebox.askyesno("Test Dialog", "This is a test dialog. Do you want to continue?", bootstyle="warning")
-            print(f"Test dialog response: {response}")
+            log.debug("Test dialog response: %s", response)
             if response:
                 messagebox.showinfo("Test Result", "You clicked Yes!", bootstyle="success")
             else:
                 messagebox.showinfo("Test Result", "You clicked No!", bootstyle="info")
         except Exception as e:
-            print(f"Error in test_dialog: {e}")
+            log.error("Error in test_dialog: %s", e)
             messagebox.showerror("Error", "Failed to display test dialog.", bootstyle="danger")
 
+    def show_schedule(self, cat_entry, repeat_entry, day_entry):
+        # Shows the saved schedule of the category typed in, unless the row's Repeat was already changed
+        schedule = self.ledger.recurring.get(cat_entry.get().strip())
+        if schedule is not None and repeat_entry.get() == self.REPEAT_UNCHANGED:
+            repeat_entry.set(schedule["type"])
+            day_entry.set(schedule["day"])
+
     def save_categories(self):
-        updated_categories = self.regular_categories.copy()
+        updated_categories = self.ledger.regular_categories.copy()
+        schedules = {}
         valid_entries = False
-        for cat_entry, amt_entry in self.category_entries:
+        for cat_entry, amt_entry, repeat_entry, day_entry in self.category_entries:
             category = cat_entry.get().strip()
             amount_str = amt_entry.get().strip()
             if category and amount_str:
@@ -281,6 +348,7 @@ class WalletApp:
                     amount = float(amount_str)
                     if amount >= 0:
                         updated_categories[category] = amount
+                        schedules[category] = (repeat_entry.get(), day_entry.get())
                         valid_entries = True
                     else:
                         messagebox.showerror("Error", f"Amount for '{category}' must be non-negative.", bootstyle="danger")
@@ -292,175 +360,397 @@ class WalletApp:
             messagebox.showerror("Error", "Please enter at least one valid category and amount.", bootstyle="danger")
             return
         
-        self.regular_categories = updated_categories
-        with open("regular_categories.json", "w") as f:
-            json.dump(self.regular_categories, f)
+        for category, (repeat, day) in schedules.items():
+            if repeat in (self.REPEAT_UNCHANGED, self.REPEAT_STOP):
+                continue
+            try:
+                if not 1 <= int(day) <= 31:
+                    raise ValueError
+            except ValueError:
+                messagebox.showerror("Error", f"Day for '{category}' must be a number from 1 to 31.", bootstyle="danger")
+                return
+
+        self.ledger.set_regular_categories(updated_categories)
+        for category, (repeat, day) in schedules.items():
+            current = self.recurring.entries.get(category)
+            if repeat == self.REPEAT_UNCHANGED:
+                continue
+            if repeat == self.REPEAT_STOP:
+                self.recurring.remove(category)
+            elif current is None or (current["type"], current["day"]) != (repeat, int(day)):
+                # An unchanged schedule keeps its next due date
+                self.recurring.set(category, repeat, int(day))
+        self.reschedule_recurring()
         self.update_balance_labels()
         self.update_categories_display()
-        self.category_entry.configure(values=list(self.regular_categories.keys()))
-        for cat_entry, amt_entry in self.category_entries:
+        if self.category_entry is not None:
+            self.category_entry.configure(values=list(self.ledger.regular_categories.keys()))
+        for cat_entry, amt_entry, repeat_entry, day_entry in self.category_entries:
             cat_entry.delete(0, tk.END)
             amt_entry.delete(0, tk.END)
+            repeat_entry.set(self.REPEAT_UNCHANGED)
+            day_entry.set(1)
         messagebox.showinfo("Success", "Categories saved successfully!", bootstyle="success")
 
     def update_categories_display(self):
-        for widget in self.categories_display_frame.winfo_children():
-            widget.destroy()
-        for category, amount in self.regular_categories.items():
-            row = ttk.Frame(self.categories_display_frame)
-            row.pack(fill="x", pady=5)
-            ttk.Label(row, text=f"{category}:", font=("Segoe UI", 16)).pack(side="left")
-            ttk.Label(row, text=f"₹{amount}", font=("Segoe UI", 16), bootstyle="success").pack(side="left", padx=10)
+        self.category_list.update(self.ledger.regular_categories, self.ledger.recurring)
 
     def switch_view(self, view_name):
-        self.home_frame.grid_remove()
-        self.input_frame.grid_remove()
-        self.chart_frame.grid_remove()
-        self.settings_frame.grid_remove()
-        if view_name == "Home":
-            self.home_frame.grid(row=0, column=0, sticky="nsew")
-        elif view_name == "Transactions":
-            self.input_frame.grid(row=0, column=0, sticky="nsew")
-            self.category_entry.configure(values=list(self.regular_categories.keys()))
-        elif view_name == "Reports":
-            self.chart_frame.grid(row=0, column=0, sticky="nsew")
-        elif view_name == "Settings":
-            self.settings_frame.grid(row=0, column=0, sticky="nsew")
+        # Views other than Home are built the first time they are opened
+        for frame in self.views.values():
+            frame.grid_remove()
+        if view_name not in self.views:
+            self.views[view_name] = self.view_builders[view_name]()
+        self.views[view_name].grid(row=0, column=0, sticky="nsew")
+        self.current_view = view_name
+        if view_name == "Transactions":
+            self.category_entry.configure(values=list(self.ledger.regular_categories.keys()))
+        elif view_name == "Reports" and self.chart_dirty:
+            self.update_graph()
+
+    def on_first_frame(self, event):
+        if event.widget is not self.root or self.first_frame_ms is not None:
+            return
+        self.first_frame_ms = (time.perf_counter() - STARTED_AT) * 1000
+        log.info("Time to first frame: %.1f ms", self.first_frame_ms)
+        metrics.record("first_frame", self.first_frame_ms / 1000)
+        log_path = os.environ.get("WALLET_STARTUP_LOG")
+        if log_path:
+            with open(log_path, "a") as f:
+                f.write(json.dumps({"time": time.time(), "first_frame_ms": round(self.first_frame_ms, 1)}) + "\n")
 
     def get_disposable_balance(self):
-        expected_total = sum(self.regular_categories.values()) if self.regular_categories else 0
-        return max(0, self.current_balance - expected_total)
+        return self.ledger.disposable_balance()
 
     def update_balance_labels(self):
-        self.balance_label.configure(text=f"Total Balance: ₹{self.current_balance}")
+        self.balance_label.configure(text=f"Total Balance: ₹{self.ledger.balance}")
         self.disposable_label.configure(text=f"Disposable Balance: ₹{self.get_disposable_balance()}")
 
     def save_transaction(self):
+        started = time.perf_counter()
         try:
             category = self.category_entry.get().strip()
             amount = float(self.amount_entry.get())
             trans_type = "Credit" if self.credit_var.get() else "Debit" if self.debit_var.get() else None
 
-            print(f"Transaction attempt: Type={trans_type}, Category={category}, Amount={amount}")
-            print(f"Current transaction history: {self.transaction_history}")
+            log.debug("Transaction attempt: type=%s category=%s amount=%s", trans_type, category, amount)
 
-            if trans_type is None:
-                messagebox.showerror("Error", "Please select either Credit or Debit", bootstyle="danger")
-                return
-            if trans_type == "Debit" and amount > self.current_balance:
-                messagebox.showerror("Error", "Insufficient balance", bootstyle="danger")
+            try:
+                warnings = self.ledger.check(trans_type, amount)
+            except TransactionRejected as e:
+                metrics.count("transactions_rejected")
+                log.info("Transaction rejected: %s", e)
+                messagebox.showerror("Error", str(e), bootstyle="danger")
                 return
 
-            today = datetime.now().strftime("%Y-%m-%d")
-            daily_debit_total = sum(t["amount"] for t in self.transaction_history if t["type"] == "Debit" and t["date"].startswith(today))
-            print(f"Daily debit total: {daily_debit_total}, New amount: {amount}, Total with new: {daily_debit_total + amount}")
-
-            # Hardcoded daily limit check of ₹5000
-            if trans_type == "Debit" and (daily_debit_total + amount) > 5000:
-                print("Daily limit of ₹5000 exceeded - showing dialog")
+            for warning in warnings:
+                metrics.count("limit_warnings")
+                log.debug("%s - showing dialog", warning)
                 try:
-                    response = messagebox.askyesno("Daily Limit Exceeded",
-                        f"Transaction of ₹{amount} exceeds ₹5000 daily limit. "
-                        f"Current spending: ₹{daily_debit_total}. Proceed?", bootstyle="warning")
-                    print(f"Dialog response: {response}")
+                    response = messagebox.askyesno("Daily Limit Exceeded", f"{warning} Proceed?", bootstyle="warning")
+                    log.debug("Dialog response: %s", response)
                     if not response:
                         messagebox.showinfo("Cancelled", "Transaction cancelled due to daily limit.", bootstyle="info")
-                        print("Transaction aborted")
+                        log.info("Transaction cancelled at the daily limit warning")
                         return
-                    else:
-                        print("Transaction approved")
                 except Exception as e:
-                    print(f"Error showing dialog: {e}")
+                    log.error("Error showing dialog: %s", e)
                     messagebox.showerror("Error", "Failed to show limit dialog. Transaction aborted.", bootstyle="danger")
                     return
 
-            monthly_total = sum(t["amount"] for t in self.transaction_history if t["type"] == "Debit" and t["date"].startswith(datetime.now().strftime("%Y-%m")))
-            print(f"Monthly debit total: {monthly_total}, New amount: {amount}, Total with new: {monthly_total + amount}")
-            if trans_type == "Debit" and self.monthly_limit > 0 and (monthly_total + amount) > self.monthly_limit:
-                messagebox.showerror("Error", f"Transaction exceeds monthly limit of ₹{self.monthly_limit}", bootstyle="danger")
-                print("Transaction aborted due to monthly limit")
-                return
-
-            print("Proceeding with transaction")
             self.add_transaction(category, amount, trans_type)
             self.category_entry.delete(0, tk.END)
             self.amount_entry.delete(0, tk.END)
             self.credit_var.set(False)
             self.debit_var.set(False)
             self.category_entry.focus_set()
+            # Recorded before the success dialog so the timing does not include the user dismissing it
+            metrics.record("save_transaction", time.perf_counter() - started)
+            log.debug("Transaction added")
             messagebox.showinfo("Success", f"{trans_type} transaction of ₹{amount} for {category} added!", bootstyle="success")
-            print("Transaction added")
         except ValueError:
+            metrics.count("invalid_amounts")
+            log.info("Invalid amount entered")
             messagebox.showerror("Error", "Invalid amount", bootstyle="danger")
-            print("Invalid amount entered")
 
+    @timed("add_transaction")
     def add_transaction(self, category, amount, transaction_type):
-        date_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        transaction = {
-            "type": transaction_type,
-            "category": category,
-            "amount": amount,
-            "date": date_time
-        }
-        self.transaction_history.append(transaction)
-
-        if transaction_type == "Credit":
-            self.current_balance += amount
-            self.credit_amounts.append(amount)
-            self.debit_amounts.append(0)
-        else:
-            self.current_balance -= amount
-            self.debit_amounts.append(amount)
-            self.credit_amounts.append(0)
-
-        self.net_balance.append(self.current_balance)
-        self.history_list.insert("", "end", values=(date_time, transaction_type, category, f"₹{amount}"))
+        self.ledger.add(category, amount, transaction_type)
+        metrics.count("transactions_added")
+        self.schedule_sync()
+        self.history_view.refresh()
         self.update_balance_labels()
         self.update_graph()
         self.check_balance_warning()
 
+    def schedule_sync(self):
+        # Flush journal writes that did not fill a whole fsync batch
+        storage = self.ledger.storage
+        if storage.pending and self.sync_job is None:
+            self.sync_job = self.root.after(int(storage.sync_interval * 1000), self.sync_storage)
+
+    def sync_storage(self):
+        self.sync_job = None
+        self.ledger.sync()
+
+    def on_close(self):
+        if self.sync_job is not None:
+            self.root.after_cancel(self.sync_job)
+        if self.import_job is not None:
+            self.root.after_cancel(self.import_job)
+        if self.export_worker is not None:
+            self.cancel_export()
+            self.export_worker.close()
+        self.stop_ingest()
+        self.recurring_timer.cancel()
+        # Lets queued saves reach disk before the ledger closes
+        self.worker.close()
+        if metrics.profiling:
+            metrics.stop_profile(self.ledger.path("wallet_profile"))
+        if metrics.enabled:
+            metrics.dump(self.ledger.path("wallet_metrics.json"))
+        self.ledger.close()
+        self.root.destroy()
+
+    @timed("update_graph")
     def update_graph(self):
-        for widget in self.chart_frame.winfo_children():
-            widget.destroy()
-
-        fig, ax = plt.subplots(figsize=(8, 4))
-        if self.transaction_history:
-            x = np.arange(len(self.transaction_history))
-            ax.plot(x, np.cumsum(self.credit_amounts), label="Credit", color='#10b981', marker='o')
-            ax.plot(x, np.cumsum(self.debit_amounts), label="Debit", color='#ef4444', marker='o')
-            ax.plot(x, self.net_balance, label="Net Balance", color='#3b82f6', marker='o')
-
-            ax.set_xlabel("Transactions")
-            ax.set_ylabel("Amount")
-            ax.set_title("Transaction Trends")
-            ax.legend()
-            ax.grid(True, color='#2d3748', linestyle='--', alpha=0.7)
-
-        fig.patch.set_facecolor('#1e293b')
-        ax.set_facecolor('#1e293b')
-        ax.tick_params(colors='#ffffff')
-        ax.spines['bottom'].set_color('#ffffff')
-        ax.spines['left'].set_color('#ffffff')
-        ax.spines['top'].set_color('#1e293b')
-        ax.spines['right'].set_color('#1e293b')
-        canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        # Reports wait until the Reports view is on screen; matplotlib is imported then too
+        if self.current_view != "Reports":
+            self.chart_dirty = True
+            return
+        self.reports_panel.refresh()
+        self.chart_dirty = False
+
+    def render_graph(self):
+        # The frame is rendered on the worker thread; queued renders collapse into the latest one
+        # Only the samples for the visible date range are computed here, from the balance index
+        if self.chart_image is None:
+            from charts import ChartImage
+            self.chart_image = ChartImage(self.reports_panel.chart_area, self.render_graph)
+            self.reports_panel.attach_chart(self.chart_image.canvas)
+        view = self.reports_panel.view
+        samples = self.ledger.reports.samples(*(view or (None, None)))
+        self.worker.submit("chart", self.render_chart, samples, view, self.chart_image.size, callback=self.show_chart)
+
+    @timed("render_chart")
+    def render_chart(self, samples, view, size):
+        # Runs on the worker thread, which owns the chart figure
+        if self.chart is None:
+            from charts import OffscreenChart
+            self.chart = OffscreenChart()
+        return self.chart.render(samples, view, *size)
+
+    def show_chart(self, frame, error):
+        if error is None:
+            self.chart_image.show(frame)
 
     def check_balance_warning(self):
-        if self.current_balance < 2000:
-            messagebox.showwarning("⚠ Low Balance", "Your balance is below ₹2000!", bootstyle="warning")
+        if self.ledger.is_low_balance():
+            messagebox.showwarning("⚠ Low Balance", f"Your balance is below ₹{self.ledger.LOW_BALANCE_LIMIT}!", bootstyle="warning")
 
     def view_history(self):
-        for item in self.history_list.get_children():
-            self.history_list.delete(item)
-        for t in self.transaction_history:
-            self.history_list.insert("", "end", values=(t["date"], t["type"], t["category"], f"₹{t['amount']}"))
+        self.history_view.refresh()
+
+    def import_statement(self):
+        if self.import_job is not None:
+            messagebox.showinfo("Import", "An import is already running.", bootstyle="info")
+            return
+        path = filedialog.askopenfilename(title="Import Statement", filetypes=[
+            ("Statements", "*.csv *.json *.jsonl *.ndjson"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            importer, steps = self.ledger.importer(path)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not open {path}: {e}", bootstyle="danger")
+            return
+        self.import_progress.grid(row=5, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        self.import_status.grid(row=6, column=0, columnspan=2, sticky="w")
+        self.import_job = self.root.after(1, self.import_step, importer, steps)
+
+    def import_step(self, importer, steps):
+        # One chunk per Tk callback so the mainloop keeps handling input between chunks
+        try:
+            progress = next(steps, None)
+        except (ValueError, OSError) as e:
+            self.finish_import(importer, str(e))
+            return
+        if progress is None:
+            self.finish_import(importer)
+            return
+        self.import_progress.configure(value=progress * 100)
+        self.import_status.configure(text=f"Imported {importer.imported} rows, rejected {importer.rejected}")
+        self.import_job = self.root.after(1, self.import_step, importer, steps)
+
+    def finish_import(self, importer, error=None):
+        self.import_job = None
+        self.import_progress.grid_remove()
+        self.import_status.grid_remove()
+        # Single refresh for the whole batch
+        self.update_balance_labels()
+        self.history_view.refresh()
+        self.update_graph()
+        summary = f"Imported {importer.imported} transactions, rejected {importer.rejected}."
+        if importer.rejects:
+            summary += "\n\n" + "\n".join(f"Row {number}: {reason}" for number, reason in importer.rejects[:10])
+            if importer.rejected > 10:
+                summary += f"\n... and {importer.rejected - 10} more"
+        if error:
+            messagebox.showerror("Import Failed", f"{error}\n\n{summary}", bootstyle="danger")
+        else:
+            messagebox.showinfo("Import Complete", summary, bootstyle="success")
+        self.check_balance_warning()
 
     def export_data(self):
-        with open("wallet_data.json", "w") as f:
-            json.dump(self.transaction_history, f, indent=4)
-        messagebox.showinfo("Exported", "Transaction history exported to wallet_data.json", bootstyle="success")
+        if self.export_job is not None and self.export_job.progress < 1:
+            messagebox.showinfo("Export", "An export is already running.", bootstyle="info")
+            return
+        path = filedialog.asksaveasfilename(title="Export History", initialfile="wallet_data.json", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("JSON Lines", "*.jsonl"), ("CSV", "*.csv"),
+                                                       ("Compressed", "*.gz"), ("All files", "*.*")])
+        if not path:
+            return
+        # Exports what the history filters currently show
+        query = self.history_view.query
+        try:
+            exporter = self.ledger.exporter(path, len(self.ledger.transactions), kind=query.kind, category=query.category,
+                                            start=query.start, end=query.end)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), bootstyle="danger")
+            return
+        # Exports get their own thread so chart renders and saves are not queued behind them
+        if self.export_worker is None:
+            self.export_worker = BackgroundWorker(self.root)
+        self.export_job = exporter
+        self.export_worker.submit("export", exporter.export, callback=lambda result, error: self.finish_export(exporter, error))
+        self.export_progress.grid(row=7, column=0, columnspan=2, sticky="ew", pady=(10, 0))
+        self.export_status.grid(row=8, column=0, columnspan=2, sticky="w")
+        self.poll_export(exporter)
+
+    def poll_export(self, exporter):
+        if exporter is not self.export_job:
+            return
+        self.export_progress.configure(value=exporter.progress * 100)
+        self.export_status_label.configure(text=f"Exported {exporter.exported} rows")
+        self.root.after(100, self.poll_export, exporter)
+
+    def cancel_export(self):
+        if self.export_job is not None:
+            self.export_job.cancel()
+
+    def finish_export(self, exporter, error):
+        self.export_job = None
+        self.export_progress.grid_remove()
+        self.export_status.grid_remove()
+        if error is not None:
+            messagebox.showerror("Error", f"Export failed: {error}", bootstyle="danger")
+        elif exporter.cancelled:
+            messagebox.showinfo("Export Cancelled", "The export was cancelled; no file was written.", bootstyle="info")
+        else:
+            messagebox.showinfo("Exported", f"{exporter.exported} transactions exported to {exporter.path}", bootstyle="success")
+
+    def reschedule_recurring(self):
+        self.recurring_timer.clear()
+        for due, category in self.recurring.next_due():
+            self.recurring_timer.push(due, category)
+
+    def post_recurring(self, categories, now):
+        # Fired by the timer queue with the categories that are due (None for all of them). Every
+        # due occurrence, however many were missed, goes to the ledger as one batch and one refresh.
+        was_low = self.ledger.is_low_balance()
+        results = self.recurring.apply(categories, now)
+        posted = sum(error is None for _, error in results)
+        if posted:
+            metrics.count("recurring_posted", posted)
+            log.info("Posted %d recurring transactions", posted)
+            self.schedule_sync()
+            self.history_view.refresh()
+            self.update_balance_labels()
+            self.update_graph()
+        if categories is not None:
+            for category in categories:
+                entry = self.recurring.entries.get(category)
+                if entry is not None:
+                    self.recurring_timer.push(parse_date(entry["next"]), category)
+        skipped = [(row, error) for row, error in results if error is not None]
+        if skipped:
+            lines = [f"{format_timestamp(ts)[:10]}  {category} ₹{amount}: {error}" for (category, amount, _, ts), error in skipped[:10]]
+            if len(skipped) > 10:
+                lines.append(f"... and {len(skipped) - 10} more")
+            self.root.after_idle(lambda: messagebox.showwarning(
+                "Recurring Transactions", f"{len(skipped)} recurring transactions were not posted:\n\n" + "\n".join(lines),
+                bootstyle="warning"))
+        elif posted and not was_low and self.ledger.is_low_balance():
+            self.root.after_idle(self.check_balance_warning)
+
+    def start_ingest(self):
+        # Returns None once the server is listening, or the reason it could not start
+        settings = self.ledger.settings
+        server = IngestServer(self.apply_posts, port=settings.get("ingest_port", 8765), path=settings.get("ingest_socket"),
+                              token=settings.get("ingest_token"))
+        try:
+            server.start()
+        except OSError as e:
+            log.error("Could not start the local API: %s", e)
+            return str(e)
+        self.ingest = server
+        self.ingest_job = self.root.after(self.INGEST_IDLE_MS, self.poll_ingest)
+        return None
+
+    def stop_ingest(self):
+        if self.ingest_job is not None:
+            self.root.after_cancel(self.ingest_job)
+            self.ingest_job = None
+        if self.ingest is not None:
+            self.ingest.stop()
+            self.ingest = None
+
+    def poll_ingest(self):
+        # Polls quickly while posts keep arriving and backs off when the API is idle
+        busy = self.ingest.drain()
+        self.ingest_job = self.root.after(self.INGEST_ACTIVE_MS if busy else self.INGEST_IDLE_MS, self.poll_ingest)
+
+    @timed("apply_posts")
+    def apply_posts(self, posts):
+        # Called by drain() on the Tk thread with every post since the last poll: one ledger batch, one refresh
+        was_low = self.ledger.is_low_balance()
+        results = apply_to_ledger(self.ledger, posts)
+        added = sum(error is None for rows in results for _, error in rows)
+        if added:
+            metrics.count("transactions_posted", added)
+            self.schedule_sync()
+            self.history_view.refresh()
+            self.update_balance_labels()
+            self.update_graph()
+            if not was_low and self.ledger.is_low_balance():
+                # Once when posts take the balance below the limit, after the posts have been answered
+                self.root.after_idle(self.check_balance_warning)
+        return results
+
+    def toggle_ingest(self):
+        if self.ingest_var.get():
+            try:
+                port = int(self.ingest_port_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "Please enter a valid port number.", bootstyle="danger")
+                self.ingest_var.set(False)
+                return
+            self.ledger.settings["ingest_port"] = port
+            error = self.start_ingest()
+            if error is not None:
+                messagebox.showerror("Error", f"Could not start the local API: {error}", bootstyle="danger")
+                self.ingest_var.set(False)
+        else:
+            self.stop_ingest()
+        self.ledger.update_settings(ingest_enabled=self.ingest is not None)
+
+    def write_file(self, name, write, *args):
+        # Ledger file writes go through the worker, keyed by file so only the latest save runs
+        self.worker.submit(name, write, *args, callback=lambda result, error: self.on_file_written(name, error))
+
+    def on_file_written(self, name, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Could not save {name}: {error}", bootstyle="danger")
 
     def update_name(self):
         new_name = self.name_entry.get().strip()
@@ -487,25 +777,34 @@ class WalletApp:
             daily_limit = float(self.daily_limit_entry.get())
             monthly_limit = float(self.monthly_limit_entry.get())
             if daily_limit >= 0 and monthly_limit >= 0:
-                self.daily_limit = daily_limit
-                self.monthly_limit = monthly_limit
-                self.save_settings()
+                self.ledger.set_limits(daily_limit, monthly_limit)
                 messagebox.showinfo("Success", "Transaction limits updated successfully!", bootstyle="success")
             else:
                 messagebox.showerror("Error", "Limits must be non-negative.", bootstyle="danger")
         except ValueError:
             messagebox.showerror("Error", "Please enter valid numbers for limits.", bootstyle="danger")
 
+    def toggle_instrumentation(self):
+        metrics.enable(self.instrumentation_var.get())
+        self.ledger.update_settings(instrumentation=metrics.enabled)
+
+    def toggle_profiling(self):
+        if metrics.profiling:
+            path = metrics.stop_profile(self.ledger.path("wallet_profile"))
+            self.profile_btn.configure(text="Start Profiling")
+            messagebox.showinfo("Profile", f"Profile written to {path}", bootstyle="success")
+        else:
+            metrics.start_profile()
+            self.profile_btn.configure(text="Stop Profiling")
+
+    def dump_metrics(self):
+        path = metrics.dump(self.ledger.path("wallet_metrics.json"))
+        messagebox.showinfo("Timings", f"{metrics.report()}\n\nWritten to {path}", bootstyle="info")
+
     def save_settings(self):
-        settings = {
-            "user_name": self.user_name,
-            "pin": self.pin,
-            "biometric_enabled": self.biometric_var.get(),
-            "daily_limit": self.daily_limit,
-            "monthly_limit": self.monthly_limit
-        }
-        with open("settings.json", "w") as f:
-            json.dump(settings, f)
+        if self.biometric_var is not None:
+            self.biometric_enabled = self.biometric_var.get()
+        self.ledger.update_settings(user_name=self.user_name, pin=self.pin, biometric_enabled=self.biometric_enabled)
 
 if __name__ == "__main__":
     root = ttk.Window(themename="default")
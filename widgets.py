@@ -0,0 +1,90 @@
+import ttkbootstrap as ttk
+from ttkbootstrap.tooltip import ToolTip
+from ttkbootstrap.scrolled import ScrolledFrame
+
+
+class FieldValidator:
+    # One ToolTip per entry, created once. Validation runs after typing pauses for `delay` ms and
+    # the entry style and tooltip are only touched when the result actually changes.
+    # validate(text) returns an error message, or None when the text is acceptable.
+    def __init__(self, entry, variable, validate, hint, delay=150, style="dark"):
+        self.entry = entry
+        self.variable = variable
+        self.validate = validate
+        self.hint = hint
+        self.delay = delay
+        self.style = style
+        self.error = None
+        self.job = None
+        self.tooltip = ToolTip(entry, text=hint, bootstyle="inverse")
+        variable.trace_add("write", self.schedule)
+
+    def schedule(self, *args):
+        if self.job is not None:
+            self.entry.after_cancel(self.job)
+        self.job = self.entry.after(self.delay, self.run)
+
+    def run(self):
+        self.job = None
+        self.show(self.validate(self.variable.get()))
+        return self.error
+
+    def show(self, error):
+        if error == self.error:
+            return
+        self.error = error
+        self.entry.configure(bootstyle="danger" if error else self.style)
+        self.tooltip.text = error or self.hint
+        self.tooltip.bootstyle = "danger" if error else "inverse"
+        if self.tooltip.toplevel is not None:
+            # Already on screen: show it again with the new text
+            self.tooltip.hide_tip()
+            self.tooltip.show_tip()
+
+
+def amount_error(value, allow_empty=True):
+    # Validator for rupee amounts
+    value = value.strip()
+    if not value:
+        return None if allow_empty else "Enter an amount in ₹"
+    try:
+        amount = float(value)
+    except ValueError:
+        return "Enter a valid number"
+    if amount < 0:
+        return "Amount cannot be negative"
+    return None
+
+
+class CategoryList:
+    # Scrollable name/amount rows for the regular categories. update() diffs the categories against
+    # the rows on screen: new categories get a row, changed amounts are relabelled in place and
+    # removed categories lose their row, so saving touches only what changed. Categories with a
+    # recurring schedule show when it falls due.
+    def __init__(self, master, font=("Segoe UI", 16)):
+        self.font = font
+        self.frame = ScrolledFrame(master, autohide=True)
+        self.frame.pack(fill="both", expand=True)
+        self.rows = {}
+
+    def update(self, categories, schedules=None):
+        schedules = schedules or {}
+        for category in [c for c in self.rows if c not in categories]:
+            self.rows.pop(category)[0].destroy()
+        for category, amount in categories.items():
+            text = f"₹{amount}"
+            schedule = schedules.get(category)
+            if schedule is not None:
+                every = "month" if schedule["every"] == 1 else f"{schedule['every']} months"
+                text += f"  ({schedule['type']} on day {schedule['day']} every {every})"
+            row = self.rows.get(category)
+            if row is None:
+                frame = ttk.Frame(self.frame)
+                frame.pack(fill="x", pady=5)
+                ttk.Label(frame, text=f"{category}:", font=self.font).pack(side="left")
+                label = ttk.Label(frame, text=text, font=self.font, bootstyle="success")
+                label.pack(side="left", padx=10)
+                self.rows[category] = (frame, label, text)
+            elif row[2] != text:
+                row[1].configure(text=text)
+                self.rows[category] = (row[0], row[1], text)
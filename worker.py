@@ -0,0 +1,81 @@
+import collections
+import threading
+import queue
+from instrument import log, metrics
+
+
+class BackgroundWorker:
+    # One worker thread fed by a keyed work queue. Submitting a key that is still waiting replaces
+    # the queued job, so bursts of chart renders or saves collapse into the latest one. Results are
+    # handed back on the Tk thread by polling with root.after while work is outstanding.
+    def __init__(self, root, poll_ms=25):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.jobs = {}
+        self.order = collections.deque()
+        self.outstanding = 0
+        self.condition = threading.Condition()
+        self.results = queue.SimpleQueue()
+        self.poll_job = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name="wallet-worker", daemon=True)
+        self.thread.start()
+
+    def submit(self, key, fn, *args, callback=None):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("worker is closed")
+            if key not in self.jobs:
+                self.order.append(key)
+                self.outstanding += 1
+            else:
+                metrics.count("worker_coalesced")
+            self.jobs[key] = (fn, args, callback)
+            self.condition.notify()
+        self._schedule_poll()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.order and not self.closed:
+                    self.condition.wait()
+                if not self.order:
+                    return
+                key = self.order.popleft()
+                fn, args, callback = self.jobs.pop(key)
+            try:
+                self.results.put((callback, fn(*args), None))
+            except Exception as e:
+                self.results.put((callback, None, e))
+
+    def _schedule_poll(self):
+        if self.poll_job is None:
+            self.poll_job = self.root.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self.poll_job = None
+        self._deliver()
+        if self.outstanding:
+            self._schedule_poll()
+
+    def _deliver(self):
+        while True:
+            try:
+                callback, result, error = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self.outstanding -= 1
+            if error is not None:
+                log.error("Background job failed: %r", error)
+            if callback is not None:
+                callback(result, error)
+
+    def close(self, timeout=10):
+        # Lets queued saves finish, then stops the thread; callbacks are not delivered after this
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join(timeout)
+        if self.poll_job is not None:
+            self.root.after_cancel(self.poll_job)
+            self.poll_job = None